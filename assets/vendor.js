@@ -0,0 +1,18 @@
+// Copy the pinned browser builds of the JS libraries into static/vendor,
+// where {% static %} and WhiteNoise serve them. Run with `npm run build:js`.
+const fs = require('fs');
+const path = require('path');
+
+const root = path.join(__dirname, '..');
+const target = path.join(root, 'static', 'vendor');
+
+const files = {
+  'chart.js/dist/chart.umd.js': 'chart.umd.js',
+  'alpinejs/dist/cdn.min.js': 'alpine.min.js',
+};
+
+fs.mkdirSync(target, { recursive: true });
+for (const [source, name] of Object.entries(files)) {
+  fs.copyFileSync(path.join(root, 'node_modules', source), path.join(target, name));
+  console.log(`static/vendor/${name}`);
+}
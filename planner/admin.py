@@ -1,9 +1,12 @@
 from django.contrib import admin
+from django.utils.html import format_html, format_html_join
 from .models import (
     UserProfile, Subject, Topic, StudyTask, 
     RevisionTask, PomodoroSession, GeneratedQuestion, 
-    Badge, SyllabusUpload
+    Badge, SyllabusUpload, ParsedSyllabus, QuestionCache, QuizAttempt,
+    RequestProfile
 )
+from .profiling import delete_files
 
 
 @admin.register(UserProfile)
@@ -54,6 +57,13 @@ class GeneratedQuestionAdmin(admin.ModelAdmin):
     search_fields = ['question_text', 'topic__name']
 
 
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(admin.ModelAdmin):
+    list_display = ['user', 'question', 'difficulty', 'is_correct', 'answered_at']
+    list_filter = ['is_correct', 'difficulty', 'answered_at']
+    search_fields = ['user__username', 'quiz_id']
+
+
 @admin.register(Badge)
 class BadgeAdmin(admin.ModelAdmin):
     list_display = ['user', 'badge_type', 'earned_at']
@@ -63,6 +73,60 @@ class BadgeAdmin(admin.ModelAdmin):
 
 @admin.register(SyllabusUpload)
 class SyllabusUploadAdmin(admin.ModelAdmin):
-    list_display = ['user', 'uploaded_at', 'processed']
-    list_filter = ['processed', 'uploaded_at']
-    search_fields = ['user__username']
+    list_display = ['user', 'uploaded_at', 'status', 'processed']
+    list_filter = ['status', 'processed', 'uploaded_at']
+    readonly_fields = ['extraction_stats']
+    search_fields = ['user__username', 'content_hash']
+
+
+@admin.register(ParsedSyllabus)
+class ParsedSyllabusAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'created_at']
+    search_fields = ['content_hash']
+
+
+@admin.register(QuestionCache)
+class QuestionCacheAdmin(admin.ModelAdmin):
+    list_display = ['topic_text', 'question_type', 'difficulty', 'hits', 'misses', 'last_used_at']
+    list_filter = ['question_type', 'difficulty']
+    search_fields = ['topic_text']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'status_code', 'duration_ms', 'user', 'hottest_function']
+    list_filter = ['method', 'status_code', 'created_at']
+    search_fields = ['path', 'view_name', 'name']
+    readonly_fields = [
+        'name', 'method', 'path', 'view_name', 'user', 'status_code',
+        'duration_ms', 'created_at', 'top_functions_table'
+    ]
+    exclude = ['top_functions']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.display(description='Hottest function')
+    def hottest_function(self, obj):
+        return obj.top_functions[0]['function'] if obj.top_functions else ''
+    
+    @admin.display(description='Top functions (by own time)')
+    def top_functions_table(self, obj):
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{:.6f}</td><td>{:.6f}</td></tr>',
+            ((f['function'], f['calls'], f['tottime'], f['cumtime']) for f in obj.top_functions)
+        )
+        return format_html(
+            '<table><thead><tr><th>Function</th><th>Calls</th><th>Own s</th><th>Cumulative s</th></tr>'
+            '</thead><tbody>{}</tbody></table><p>Dumps: <code>{}.prof</code>, <code>{}.collapsed</code></p>',
+            rows, obj.name, obj.name
+        )
+    
+    def delete_model(self, request, obj):
+        delete_files(obj.name)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        for name in queryset.values_list('name', flat=True):
+            delete_files(name)
+        super().delete_queryset(request, queryset)
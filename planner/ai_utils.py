@@ -2,53 +2,96 @@
 AI utilities for syllabus processing and question generation.
 Note: This uses a mock implementation. For production, integrate with OpenAI API.
 """
+import bisect
+import io
+import itertools
 import re
-import random
+import threading
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+from .instrumentation import sized, timed
+from .topic_model import get_topic_model
 
-def extract_topics_from_text(text):
-    """
-    Extract subjects, chapters, and topics from syllabus text.
-    This is a simplified implementation. For production, use OpenAI API.
+
+# Patterns used by the syllabus parser, compiled once at import time
+SUBJECT_PREFIX = 'subject'
+CHAPTER_PATTERN = re.compile(r'^(chapter|unit|module)\s+\d+', re.IGNORECASE)
+TOPIC_PATTERN = re.compile(r'^[\d\.\-\*\•]\s*')
+
+# Parsed topics are scored for difficulty in batches of this size
+TOPIC_SCORING_BATCH = 256
+
+
+def iter_topics(lines):
     """
-    topics = []
+    Incrementally extract topics from a syllabus.
     
-    # Simple pattern matching for common syllabus formats
-    lines = text.split('\n')
+    ``lines`` may be any iterable of lines: an open text or binary file, a
+    list of strings or a generator. Topics are scored and yielded in small
+    batches, so memory use stays bounded regardless of the input size.
+    """
     current_subject = None
     current_chapter = None
+    pending = []
+    chapter_match = CHAPTER_PATTERN.match
+    topic_match = TOPIC_PATTERN.match
     
     for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
         line = line.strip()
         if not line:
             continue
         
         # Detect subject (usually in caps or starts with "Subject:")
-        if line.isupper() or line.lower().startswith('subject'):
+        if line.isupper() or line[:7].lower() == SUBJECT_PREFIX:
             current_subject = line.replace('SUBJECT:', '').replace('Subject:', '').strip()
             continue
         
         # Detect chapter (usually starts with "Chapter" or numbers)
-        if re.match(r'^(chapter|unit|module)\s+\d+', line, re.IGNORECASE):
+        if chapter_match(line):
             current_chapter = line
             continue
         
         # Detect topics (usually bullet points or numbered lists)
-        if re.match(r'^[\d\.\-\*\•]\s*', line):
-            topic_name = re.sub(r'^[\d\.\-\*\•]\s*', '', line).strip()
-            if topic_name and current_subject:
-                topics.append({
+        match = topic_match(line)
+        if match and current_subject:
+            topic_name = line[match.end():].strip()
+            if topic_name:
+                pending.append({
                     'subject': current_subject,
                     'chapter': current_chapter or 'General',
                     'topic': topic_name,
-                    'difficulty': random.randint(3, 8),  # Mock difficulty
-                    'estimated_hours': round(random.uniform(1.5, 4.0), 1)
                 })
+                if len(pending) >= TOPIC_SCORING_BATCH:
+                    yield from score_topics(pending)
+                    pending = []
+    
+    yield from score_topics(pending)
+
+
+def score_topics(items):
+    """Attach the current difficulty and estimated hours to parsed topics."""
+    estimates = predict_topic_estimates((item['topic'], item['chapter']) for item in items)
+    for item, (difficulty, hours) in zip(items, estimates):
+        item['difficulty'] = difficulty
+        item['estimated_hours'] = hours
+        yield item
+
+
+@timed(size=lambda text: len(text))
+def extract_topics_from_text(text):
+    """
+    Extract subjects, chapters, and topics from syllabus text.
+    This is a simplified implementation. For production, use OpenAI API.
+    """
+    topics = list(iter_topics(io.StringIO(text)))
     
     # If no topics found, create some default ones
     if not topics and text:
-        words = text.split()
+        words = text.split(maxsplit=11)
         if len(words) > 10:
             topics.append({
                 'subject': 'General Studies',
@@ -61,6 +104,7 @@ def extract_topics_from_text(text):
     return topics
 
 
+@timed(size=lambda topics, *args, **kwargs: sized(topics))
 def generate_study_schedule(topics, exam_date, daily_hours, start_date=None):
     """
     Generate a study schedule based on topics and available time.
@@ -127,69 +171,170 @@ def calculate_revision_dates(completion_date):
     }
 
 
+# Keyword tiers for the difficulty heuristic, from hardest to easiest
+DIFFICULTY_KEYWORDS = {
+    'hard': ['advanced', 'complex', 'theorem', 'proof', 'calculus', 'quantum', 'organic'],
+    'medium': ['analysis', 'application', 'integration', 'differentiation'],
+    'easy': ['introduction', 'basic', 'fundamental', 'overview'],
+}
+
+# Score range (inclusive) for each tier; None is used when no keyword matches
+DIFFICULTY_RANGES = {
+    'hard': (7, 10),
+    'medium': (4, 7),
+    'easy': (1, 4),
+    None: (3, 7),
+}
+
+# All tiers matched in a single pass; the group name identifies the tier.
+# The leading lookahead lets the scanner skip positions that can't start a keyword.
+DIFFICULTY_PATTERN = re.compile('(?=[{}])(?:{})'.format(
+    re.escape(''.join(sorted({k[0] for ks in DIFFICULTY_KEYWORDS.values() for k in ks}))),
+    '|'.join(
+        f"(?P<{tier}>{'|'.join(map(re.escape, keywords))})"
+        for tier, keywords in DIFFICULTY_KEYWORDS.items()
+    )
+))
+
+# Tier precedence when a topic matches several tiers (lower wins)
+DIFFICULTY_TIER_RANK = {'hard': 0, 'medium': 1, 'easy': 2}
+
+DIFFICULTY_CACHE_SIZE = 10000
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used mapping."""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_many(self, keys):
+        """Return cached values for ``keys``, with None for misses."""
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key)
+                if value is not None:
+                    self._data.move_to_end(key)
+                values.append(value)
+        return values
+    
+    def set_many(self, items):
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+_difficulty_cache = LRUCache(DIFFICULTY_CACHE_SIZE)
+
+
+def normalize_topic_text(topic_name, chapter_name=''):
+    """Lowercase and collapse whitespace so equivalent topics share a cache key."""
+    return ' '.join(f'{topic_name} {chapter_name}'.lower().split())
+
+
+def _score_for_tier(text, tier):
+    """Pick a stable score within the range of ``tier``."""
+    low, high = DIFFICULTY_RANGES[tier]
+    # A content hash spreads topics across the range like the old random
+    # draw did, but the same text always gets the same score
+    return low + zlib.crc32(text.encode('utf-8')) % (high - low + 1)
+
+
+@timed(size=lambda topics: sized(topics))
+def predict_topic_difficulties(topics):
+    """
+    Predict difficulty scores (1-10) for many topics in one call.
+    
+    ``topics`` is an iterable of ``(topic_name, chapter_name)`` pairs. Texts
+    not already cached are joined and scanned once with the compiled keyword
+    pattern. Scores are deterministic and memoized by normalized text.
+    """
+    texts = [normalize_topic_text(name, chapter) for name, chapter in topics]
+    scores = _difficulty_cache.get_many(texts)
+    
+    misses = list(dict.fromkeys(
+        text for text, score in zip(texts, scores) if score is None
+    ))
+    if misses:
+        # Keywords never contain newlines, so matches can't span two topics
+        joined = '\n'.join(misses)
+        offsets = list(itertools.accumulate(len(text) + 1 for text in misses))
+        ranks = [len(DIFFICULTY_TIER_RANK)] * len(misses)
+        for match in DIFFICULTY_PATTERN.finditer(joined):
+            index = bisect.bisect_right(offsets, match.start())
+            rank = DIFFICULTY_TIER_RANK[match.lastgroup]
+            if rank < ranks[index]:
+                ranks[index] = rank
+        
+        tiers = list(DIFFICULTY_TIER_RANK) + [None]
+        computed = {
+            text: _score_for_tier(text, tiers[rank])
+            for text, rank in zip(misses, ranks)
+        }
+        _difficulty_cache.set_many(computed.items())
+        scores = [computed[text] if score is None else score for text, score in zip(texts, scores)]
+    
+    return scores
+
+
+@timed(size=lambda topic_name, chapter_name='': len(topic_name) + len(chapter_name))
 def predict_topic_difficulty(topic_name, chapter_name=''):
     """
-    Predict difficulty score for a topic (1-10).
-    This is a mock implementation. For production, use ML model.
+    Keyword-heuristic difficulty score (1-10) for one topic.
+    Syllabus imports use ``predict_topic_estimates`` instead, which prefers
+    the trained topic model when one is available.
     """
-    # Simple heuristic based on keywords
-    hard_keywords = ['advanced', 'complex', 'theorem', 'proof', 'calculus', 'quantum', 'organic']
-    medium_keywords = ['analysis', 'application', 'integration', 'differentiation']
-    easy_keywords = ['introduction', 'basic', 'fundamental', 'overview']
+    return predict_topic_difficulties([(topic_name, chapter_name)])[0]
+
+
+def estimate_topic_hours(difficulty):
+    """Map a difficulty score (1-10) onto 1.5-4.0 estimated study hours."""
+    return round(1.5 + (difficulty - 1) * 2.5 / 9, 1)
+
+
+def predict_topic_estimates(topics):
+    """
+    Predict ``(difficulty, estimated_hours)`` for ``(topic_name, chapter_name)`` pairs.
     
-    text = (topic_name + ' ' + chapter_name).lower()
+    Uses the trained local model when one is available (see
+    ``manage.py train_topic_model``) and falls back to the keyword heuristic.
+    """
+    topics = list(topics)
+    model = get_topic_model()
+    if model is not None:
+        difficulties, hours = model.predict(topics)
+        return list(zip(difficulties, hours))
     
-    if any(keyword in text for keyword in hard_keywords):
-        return random.randint(7, 10)
-    elif any(keyword in text for keyword in medium_keywords):
-        return random.randint(4, 7)
-    elif any(keyword in text for keyword in easy_keywords):
-        return random.randint(1, 4)
-    else:
-        return random.randint(3, 7)
+    return [(score, estimate_topic_hours(score)) for score in predict_topic_difficulties(topics)]
 
 
-def generate_questions(topic_name, question_type, difficulty, num_questions=5):
+@timed(size=lambda topic_name, question_type, difficulty, num_questions=5, offset=0, avoid=(): num_questions)
+def generate_questions(topic_name, question_type, difficulty, num_questions=5, offset=0, avoid=()):
     """
     Generate questions for a topic.
-    This is a mock implementation. For production, use OpenAI API.
-    """
-    questions = []
-    
-    for i in range(num_questions):
-        if question_type == 'mcq':
-            question = {
-                'type': 'mcq',
-                'question': f"What is the key concept in {topic_name}? (Question {i+1})",
-                'options': {
-                    'A': f"Option A related to {topic_name}",
-                    'B': f"Option B related to {topic_name}",
-                    'C': f"Option C related to {topic_name}",
-                    'D': f"Option D related to {topic_name}",
-                },
-                'correct_answer': random.choice(['A', 'B', 'C', 'D']),
-                'explanation': f"This question tests understanding of {topic_name}."
-            }
-        elif question_type == 'short':
-            question = {
-                'type': 'short',
-                'question': f"Briefly explain the main concept of {topic_name}. (Question {i+1})",
-                'answer': f"The main concept involves understanding the fundamental principles of {topic_name}.",
-                'explanation': f"A good answer should cover the key aspects of {topic_name}."
-            }
-        else:  # long
-            question = {
-                'type': 'long',
-                'question': f"Discuss in detail the various aspects of {topic_name}. (Question {i+1})",
-                'answer': f"A comprehensive discussion of {topic_name} should include theoretical foundations, practical applications, and real-world examples.",
-                'explanation': f"This question requires in-depth knowledge of {topic_name}."
-            }
-        
-        questions.append(question)
+    Delegates to the backend configured in ``settings.QUESTION_BACKEND``;
+    ``offset`` is the index of the first question, for numbering, and
+    ``avoid`` the texts of existing questions not to repeat.
+    """
+    from .question_backends import generate_question_batches
     
-    return questions
+    return generate_question_batches([(topic_name, question_type, difficulty, num_questions, offset, avoid)])[0]
 
 
+@timed(size=lambda pomodoros_today, tasks_completed, revisions_done: pomodoros_today + tasks_completed + revisions_done)
 def calculate_productivity_score(pomodoros_today, tasks_completed, revisions_done):
     """
     Calculate daily productivity score (0-100).
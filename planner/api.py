@@ -0,0 +1,174 @@
+"""
+Versioned JSON API for the mobile client, mounted at ``/api/v1/``.
+
+Lists are cursor-paginated (``?cursor=``, ``?limit=``), so every page costs
+one query however deep the client scrolls and no COUNT is run. ``?fields=``
+trims both the payload and the columns loaded: each endpoint selects only
+the columns its serializer will output, joining related rows with
+``select_related`` instead of querying them per object. GET responses carry
+an ETag, and a request whose ``If-None-Match`` still matches gets an empty
+304 instead of the page.
+
+Subjects and topics can be created, edited and deleted here. Tasks,
+revisions, pomodoros and questions are read-only; the existing endpoints
+(``tasks/bulk/``, ``pomodoro/sync/``) remain the way to change them, since
+they also award XP and schedule revisions.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework import mixins, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.routers import DefaultRouter
+
+from .models import GeneratedQuestion, PomodoroSession, RevisionTask, StudyTask, Subject, Topic
+from .serializers import (
+    GeneratedQuestionSerializer, PomodoroSessionSerializer, RevisionTaskSerializer,
+    StudyTaskSerializer, SubjectSerializer, TopicSerializer
+)
+
+
+class PlannerCursorPagination(CursorPagination):
+    """Keyset pagination in each viewset's ``ordering``."""
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(view.ordering)
+
+
+def load_only(queryset, serializer, ordering):
+    """Restrict ``queryset`` to the columns ``serializer`` reads, joining the relations it follows."""
+    columns = {'pk'} | {name.lstrip('-') for name in ordering}
+    related = set()
+    for field in serializer.fields.values():
+        if field.source == '*':
+            continue
+        columns.add('__'.join(field.source_attrs))
+        for depth in range(1, len(field.source_attrs)):
+            path = '__'.join(field.source_attrs[:depth])
+            # A relation we join through has to be loaded itself
+            columns.add(path)
+            related.add(path)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))
+
+
+class PlannerViewSet(viewsets.GenericViewSet):
+    """Base for the API endpoints: the user's own rows, paginated, trimmed and cacheable."""
+    pagination_class = PlannerCursorPagination
+    model = None
+    # Lookup from the model to its owner
+    owner_lookup = 'user'
+    ordering = ('-id',)
+    # Query parameter -> lookup, for the list filters an endpoint accepts
+    query_filters = {}
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(**{self.owner_lookup: self.request.user})
+        if self.request.method in SAFE_METHODS:
+            queryset = load_only(queryset, self.get_serializer(), self.ordering)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        if self.action != 'list':
+            return queryset
+        filters = {
+            lookup: self.request.query_params[param]
+            for param, lookup in self.query_filters.items()
+            if self.request.query_params.get(param, '') != ''
+        }
+        try:
+            return queryset.filter(**filters)
+        except (DjangoValidationError, ValueError) as error:
+            raise ValidationError({'filters': [str(error)]})
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        response.render()
+        patch_cache_control(response, private=True, no_cache=True)
+        etag = '"%s"' % hashlib.md5(response.content, usedforsecurity=False).hexdigest()
+        response['ETag'] = etag
+        return get_conditional_response(request, etag=etag, response=response)
+
+
+class SubjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                     mixins.UpdateModelMixin, mixins.DestroyModelMixin, PlannerViewSet):
+    model = Subject
+    serializer_class = SubjectSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class TopicViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                   mixins.UpdateModelMixin, mixins.DestroyModelMixin, PlannerViewSet):
+    model = Topic
+    serializer_class = TopicSerializer
+    owner_lookup = 'subject__user'
+    query_filters = {
+        'subject': 'subject_id',
+        'completed': 'is_completed',
+    }
+
+
+class StudyTaskViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, PlannerViewSet):
+    model = StudyTask
+    serializer_class = StudyTaskSerializer
+    ordering = ('scheduled_date', 'id')
+    query_filters = {
+        'status': 'status',
+        'topic': 'topic_id',
+        'date': 'scheduled_date',
+        'from': 'scheduled_date__gte',
+        'to': 'scheduled_date__lte',
+    }
+
+
+class RevisionTaskViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, PlannerViewSet):
+    model = RevisionTask
+    serializer_class = RevisionTaskSerializer
+    ordering = ('scheduled_date', 'id')
+    query_filters = {
+        'completed': 'is_completed',
+        'topic': 'topic_id',
+        'from': 'scheduled_date__gte',
+        'to': 'scheduled_date__lte',
+    }
+
+
+class PomodoroSessionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, PlannerViewSet):
+    model = PomodoroSession
+    serializer_class = PomodoroSessionSerializer
+    query_filters = {
+        'topic': 'topic_id',
+        'completed': 'completed',
+        'since': 'started_at__gte',
+    }
+
+
+class GeneratedQuestionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, PlannerViewSet):
+    model = GeneratedQuestion
+    serializer_class = GeneratedQuestionSerializer
+    query_filters = {
+        'topic': 'topic_id',
+        'subject': 'topic__subject_id',
+        'type': 'question_type',
+        'difficulty': 'difficulty',
+    }
+
+
+router = DefaultRouter()
+router.register('subjects', SubjectViewSet, basename='subject')
+router.register('topics', TopicViewSet, basename='topic')
+router.register('tasks', StudyTaskViewSet, basename='task')
+router.register('revisions', RevisionTaskViewSet, basename='revision')
+router.register('pomodoros', PomodoroSessionViewSet, basename='pomodoro')
+router.register('questions', GeneratedQuestionViewSet, basename='question')
@@ -0,0 +1,67 @@
+"""
+System checks for the planner app, run by ``manage.py check`` and before
+``runserver``, ``migrate`` and the other management commands.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Tags, Warning, register
+from django.template import engines
+
+# Scripts that compile CSS or JS in the browser on every page view, and what they are
+RUNTIME_COMPILERS = {
+    'cdn.tailwindcss.com': 'the Tailwind Play CDN',
+    '@tailwindcss/browser': 'the Tailwind browser build',
+    '@babel/standalone': 'in-browser Babel',
+    'babel-standalone': 'in-browser Babel',
+    'less.min.js': 'in-browser Less',
+}
+
+# Files produced by `npm run build`
+BUILT_ASSETS = ['css/app.css', 'vendor/chart.umd.js', 'vendor/alpine.min.js']
+
+
+def project_template_files():
+    """Yield the template files that live in this project (not in installed packages)."""
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    seen = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = os.path.realpath(directory)
+            if not directory.startswith(base_dir) or directory in seen:
+                continue
+            seen.add(directory)
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith(('.html', '.txt', '.xml')):
+                        yield os.path.join(root, name)
+
+
+@register(Tags.templates)
+def check_runtime_compilers(app_configs, **kwargs):
+    errors = []
+    for path in project_template_files():
+        with open(path, encoding='utf-8', errors='replace') as handle:
+            source = handle.read()
+        for marker, name in RUNTIME_COMPILERS.items():
+            if marker in source:
+                errors.append(Error(
+                    f'{os.path.relpath(path, settings.BASE_DIR)} loads {name} ({marker}).',
+                    hint="Build the CSS with `npm run build` and link it with {% static 'css/app.css' %}.",
+                    obj=path,
+                    id='planner.E001',
+                ))
+    return errors
+
+
+@register(Tags.staticfiles)
+def check_built_assets(app_configs, **kwargs):
+    missing = [name for name in BUILT_ASSETS if finders.find(name) is None]
+    if not missing:
+        return []
+    return [Warning(
+        f"Static assets haven't been built: {', '.join(missing)}.",
+        hint='Run `npm ci && npm run build` before collectstatic; pages are unstyled without them.',
+        id='planner.W001',
+    )]
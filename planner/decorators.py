@@ -0,0 +1,23 @@
+"""
+View decorators for ``async def`` views.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+
+
+def async_login_required(view):
+    """
+    ``login_required`` for ``async def`` views, which Django 4.2's decorator
+    can't wrap. Loading ``request.user`` queries the session and user tables,
+    so it runs in a worker thread; afterwards the view can use ``request.user``
+    from the event loop without blocking.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,228 @@
+"""
+Near-duplicate detection for generated questions.
+
+Each question gets a MinHash signature over character shingles of its
+normalized text. Signatures are split into LSH bands, and every band is
+stored as a QuestionBucket row keyed by (topic, band hash). Questions that
+share a bucket with a new question are the only ones compared, so a check
+costs a single indexed lookup no matter how large the topic's bank is.
+Candidates whose estimated Jaccard similarity reaches
+QUESTION_DEDUP_THRESHOLD are treated as duplicates.
+"""
+import hashlib
+import operator
+import re
+import struct
+import zlib
+
+from django.conf import settings
+from django.db import router, transaction
+
+from .models import GeneratedQuestion, QuestionBucket
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the pure Python path gives identical signatures
+    np = None
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SWEEP_DELETE_BATCH = 500
+
+# Multiply-shift hashing: (a * x + b) mod 2**64, keeping the top 32 bits.
+# One (a, b) pair per permutation, with every a odd.
+_MASK64 = (1 << 64) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') | 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big'))
+    for i in range(NUM_PERMUTATIONS)
+]
+if np is not None:
+    _A = np.array([[a] for a, _ in _PERMUTATIONS], dtype=np.uint64)
+    _B = np.array([[b] for _, b in _PERMUTATIONS], dtype=np.uint64)
+_SIGNATURE_FORMAT = f'<{NUM_PERMUTATIONS}I'
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def shingles(text):
+    """Return the set of hashed character shingles of normalized ``text``."""
+    text = WHITESPACE_PATTERN.sub(' ', text.lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8'))
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """Return the MinHash signature of ``text`` as a tuple of 32-bit ints."""
+    ids = shingles(text)
+    if np is not None:
+        x = np.fromiter(ids, dtype=np.uint64, count=len(ids))
+        # uint64 arithmetic wraps, which is exactly the mod 2**64 we want
+        return tuple(((_A * x + _B) >> np.uint64(32)).min(axis=1).tolist())
+    return tuple(
+        min(((a * x + b) & _MASK64) >> 32 for x in ids)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def pack(sig):
+    return struct.pack(_SIGNATURE_FORMAT, *sig)
+
+
+def unpack(data):
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
+
+
+def band_keys(sig):
+    """Return one signed 64-bit bucket key per LSH band."""
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'<B{ROWS_PER_BAND}I', band, *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def similarity(a, b):
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(map(operator.eq, a, b)) / NUM_PERMUTATIONS
+
+
+class SignatureIndex:
+    """In-memory LSH index used to check a batch against itself."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.buckets = {}
+
+    def find(self, sig, keys):
+        """Return the id of an indexed near-duplicate of ``sig``, or None."""
+        seen = set()
+        for key in keys:
+            for item_id, other in self.buckets.get(key, ()):
+                if item_id not in seen:
+                    seen.add(item_id)
+                    if similarity(sig, other) >= self.threshold:
+                        return item_id
+        return None
+
+    def add(self, item_id, sig, keys):
+        for key in keys:
+            self.buckets.setdefault(key, []).append((item_id, sig))
+
+
+def filter_duplicates(topic, questions, threshold=None):
+    """
+    Drop near-duplicates from unsaved ``questions`` for ``topic``.
+
+    Questions are compared with each other and with the topic's saved
+    questions. Kept questions get their ``minhash`` set. Returns
+    ``(kept, rejected_count)``.
+    """
+    threshold = settings.QUESTION_DEDUP_THRESHOLD if threshold is None else threshold
+    prepared = []
+    for question in questions:
+        sig = signature(question.question_text)
+        prepared.append((question, sig, band_keys(sig)))
+
+    all_keys = {key for _, _, keys in prepared for key in keys}
+    candidate_ids = set(QuestionBucket.objects.filter(
+        topic=topic, key__in=all_keys
+    ).values_list('question_id', flat=True))
+
+    index = SignatureIndex(threshold)
+    for pk, data in GeneratedQuestion.objects.filter(
+        pk__in=candidate_ids, minhash__isnull=False
+    ).values_list('pk', 'minhash'):
+        sig = unpack(data)
+        index.add(pk, sig, band_keys(sig))
+
+    kept = []
+    for position, (question, sig, keys) in enumerate(prepared):
+        if index.find(sig, keys) is not None:
+            continue
+        question.minhash = pack(sig)
+        index.add(('new', position), sig, keys)
+        kept.append(question)
+    return kept, len(questions) - len(kept)
+
+
+def index_questions(questions):
+    """Store LSH buckets for saved questions that have a signature."""
+    QuestionBucket.objects.bulk_create([
+        QuestionBucket(topic_id=question.topic_id, question_id=question.pk, key=key)
+        for question in questions
+        if question.minhash
+        for key in band_keys(unpack(question.minhash))
+    ], batch_size=1000)
+
+
+def save_questions(topic, questions):
+    """
+    Save ``questions`` for ``topic``, skipping near-duplicates.
+    Returns ``(created, rejected_count)``.
+    """
+    with transaction.atomic(using=router.db_for_write(GeneratedQuestion, instance=topic)):
+        kept, rejected = filter_duplicates(topic, questions)
+        created = GeneratedQuestion.objects.bulk_create(kept)
+        if any(question.pk is None for question in created):
+            # This database doesn't return primary keys from bulk inserts; the
+            # newest row with each text is the one just inserted
+            pks = dict(GeneratedQuestion.objects.filter(
+                topic=topic,
+                question_text__in={question.question_text for question in created}
+            ).order_by('pk').values_list('question_text', 'pk'))
+            for question in created:
+                question.pk = pks[question.question_text]
+        index_questions(created)
+    return created, rejected
+
+
+def sweep_topic(topic_id, threshold=None, dry_run=False):
+    """
+    Remove near-duplicate questions within one topic, keeping the oldest copy.
+
+    Missing signatures and buckets are backfilled for the questions that
+    are kept. Returns the number of duplicates found.
+    """
+    threshold = settings.QUESTION_DEDUP_THRESHOLD if threshold is None else threshold
+    questions = GeneratedQuestion.objects.filter(topic_id=topic_id).order_by(
+        'created_at', 'id'
+    ).only('id', 'topic_id', 'question_text', 'minhash')
+
+    index = SignatureIndex(threshold)
+    kept, duplicates, backfill = [], [], []
+    for question in questions.iterator(chunk_size=2000):
+        if question.minhash:
+            sig = unpack(question.minhash)
+        else:
+            sig = signature(question.question_text)
+            question.minhash = pack(sig)
+            backfill.append(question)
+        keys = band_keys(sig)
+        if index.find(sig, keys) is not None:
+            duplicates.append(question.pk)
+            continue
+        index.add(question.pk, sig, keys)
+        kept.append(question)
+
+    if dry_run:
+        return len(duplicates)
+
+    duplicate_ids = set(duplicates)
+    with transaction.atomic(using=router.db_for_write(GeneratedQuestion)):
+        GeneratedQuestion.objects.bulk_update(
+            [q for q in backfill if q.pk not in duplicate_ids], ['minhash'], batch_size=1000
+        )
+        # Queryset deletes send post_delete, which keeps the search index in sync
+        for start in range(0, len(duplicates), SWEEP_DELETE_BATCH):
+            GeneratedQuestion.objects.filter(pk__in=duplicates[start:start + SWEEP_DELETE_BATCH]).delete()
+        QuestionBucket.objects.filter(topic_id=topic_id).delete()
+        index_questions(kept)
+    return len(duplicates)
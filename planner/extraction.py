@@ -0,0 +1,138 @@
+"""
+Text extraction for uploaded syllabus documents.
+
+This module deliberately avoids importing Django so that its functions can
+run inside process-pool workers. PDF pages are split into ranges that are
+extracted in parallel; text is yielded line by line so it can be streamed
+straight into ``ai_utils.iter_topics``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ExtractionError(Exception):
+    """Raised when a document cannot be read or exceeds the configured limits."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_page_pool(max_workers):
+    """Return the shared process pool used for PDF page extraction."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _pool
+
+
+def _extract_pdf_range(path, start, stop):
+    """Extract pages ``[start, stop)`` of a PDF. Runs in a worker process."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    pages = []
+    for index in range(start, stop):
+        began = time.perf_counter()
+        text = reader.pages[index].extract_text() or ''
+        pages.append((index + 1, text, time.perf_counter() - began))
+    return pages
+
+
+def iter_pdf_lines(path, metrics, max_pages=300, pages_per_task=16, workers=None):
+    """
+    Yield the lines of a PDF, extracting page ranges in a process pool.
+
+    Per-page extraction times are appended to ``metrics['page_seconds']``.
+    """
+    from PyPDF2 import PdfReader
+    from PyPDF2.errors import PdfReadError
+
+    try:
+        page_count = len(PdfReader(path).pages)
+    except PdfReadError as e:
+        raise ExtractionError(f'Could not read PDF: {e}')
+
+    if page_count > max_pages:
+        raise ExtractionError(
+            f'PDF has {page_count} pages; the limit is {max_pages}.'
+        )
+
+    metrics['pages'] = page_count
+    metrics['page_seconds'] = []
+    ranges = [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+
+    if len(ranges) <= 1:
+        results = (_extract_pdf_range(path, start, stop) for start, stop in ranges)
+    else:
+        pool = get_page_pool(workers or min(4, os.cpu_count() or 1))
+        results = pool.map(_extract_pdf_range, [path] * len(ranges),
+                           [r[0] for r in ranges], [r[1] for r in ranges])
+
+    # map() preserves order, so lines reach the parser in document order
+    for chunk in results:
+        for page_number, text, seconds in chunk:
+            metrics['page_seconds'].append(round(seconds, 4))
+            yield from text.splitlines()
+
+
+def iter_docx_lines(path, metrics):
+    """Yield the paragraphs of a DOCX file, restoring bullets on list items."""
+    import docx
+
+    try:
+        document = docx.Document(path)
+    except Exception as e:
+        raise ExtractionError(f'Could not read DOCX: {e}')
+
+    paragraphs = 0
+    for paragraph in document.paragraphs:
+        paragraphs += 1
+        text = paragraph.text
+        # Word stores bullets as numbering, not text; restore them for the parser
+        if text and paragraph.style is not None and paragraph.style.name.startswith('List'):
+            text = '- ' + text
+        yield text
+
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                yield from cell.text.splitlines()
+
+    metrics['paragraphs'] = paragraphs
+
+
+def iter_text_lines(path, metrics):
+    """Yield the lines of a plain-text file."""
+    with open(path, 'rb') as handle:
+        for line in handle:
+            yield line.decode('utf-8', errors='replace')
+
+
+def iter_document_lines(path, metrics, max_pages=300, pages_per_task=16, workers=None):
+    """
+    Yield text lines from a PDF, DOCX or TXT file, dispatching on extension.
+
+    ``metrics`` is filled in with timing information as extraction proceeds.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    began = time.perf_counter()
+
+    if extension == '.pdf':
+        lines = iter_pdf_lines(path, metrics, max_pages, pages_per_task, workers)
+    elif extension == '.docx':
+        lines = iter_docx_lines(path, metrics)
+    elif extension == '.txt':
+        lines = iter_text_lines(path, metrics)
+    else:
+        raise ExtractionError(f'Unsupported file type: {extension or "unknown"}')
+
+    yield from lines
+    # Wall time covers both extraction and whatever consumed the lines
+    metrics['total_seconds'] = round(time.perf_counter() - began, 4)
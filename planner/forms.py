@@ -1,7 +1,9 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import UserProfile, Subject, Topic, SyllabusUpload
+from .quiz import MAX_QUIZ_LENGTH
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -62,6 +64,16 @@ class SyllabusUploadForm(forms.ModelForm):
         widgets = {
             'file': forms.FileInput(attrs={'class': 'form-input', 'accept': '.pdf,.docx,.txt'}),
         }
+    
+    def clean_file(self):
+        file = self.cleaned_data.get('file')
+        if file:
+            if not file.name.lower().endswith(('.pdf', '.docx', '.txt')):
+                raise forms.ValidationError('Only PDF, DOCX and TXT files are supported.')
+            max_mb = settings.SYLLABUS_MAX_UPLOAD_MB
+            if file.size > max_mb * 1024 * 1024:
+                raise forms.ValidationError(f'Files larger than {max_mb} MB are not accepted.')
+        return file
 
 
 class ScheduleGeneratorForm(forms.Form):
@@ -125,3 +137,32 @@ class QuestionGeneratorForm(forms.Form):
     def __init__(self, user, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['topic'].queryset = Topic.objects.filter(subject__user=user)
+
+
+class QuizStartForm(forms.Form):
+    TYPE_CHOICES = [('', 'All types')] + QuestionGeneratorForm.TYPE_CHOICES
+    
+    topic = forms.ModelChoiceField(
+        queryset=Topic.objects.none(),
+        required=False,
+        empty_label='All topics',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Topic'
+    )
+    question_type = forms.ChoiceField(
+        choices=TYPE_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Question Type'
+    )
+    num_questions = forms.IntegerField(
+        min_value=1,
+        max_value=MAX_QUIZ_LENGTH,
+        initial=10,
+        widget=forms.NumberInput(attrs={'class': 'form-input'}),
+        label='Number of Questions'
+    )
+    
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['topic'].queryset = Topic.objects.filter(subject__user=user)
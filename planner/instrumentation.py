@@ -0,0 +1,202 @@
+"""
+Latency histograms for hot functions, bucketed by input size.
+
+Decorate a function with ``@timed(size=...)`` to record how long each call
+takes, grouped by the size of its input (rounded up to a power of two), so
+a function whose time grows faster than its input stands out.
+
+Every thread records into its own buffer, so the hot path takes no locks.
+Buffers are merged when a snapshot is written: each process rewrites
+``FUNCTION_TIMING_DIR/timings-<pid>.json`` at most every
+FUNCTION_TIMING_FLUSH_SECONDS and at exit, and
+``manage.py function_timings`` merges the snapshots of all processes.
+
+Timing is switched on with FUNCTION_TIMING_ENABLED, which is read when the
+decorated module is imported. When off, ``timed`` returns the function
+unchanged.
+"""
+import atexit
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from time import perf_counter
+
+from django.conf import settings
+
+from .metrics import Histogram
+
+# Log-spaced from 10µs to 10s
+DURATION_BUCKETS = tuple(
+    round(base * 10 ** exponent, 6)
+    for exponent in range(-5, 1)
+    for base in (1, 2.5, 5)
+) + (10.0,)
+
+_local = threading.local()
+_buffers = []
+_buffers_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def size_bucket(size):
+    """Round ``size`` up to a power of two (0 stays 0)."""
+    return 1 << (size - 1).bit_length() if size > 0 else 0
+
+
+def _thread_buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = {}
+        # Taken once per thread; recording itself never locks
+        with _buffers_lock:
+            _buffers.append(buffer)
+    return buffer
+
+
+def observe(name, size, seconds):
+    """Record one call of ``name`` with input ``size`` taking ``seconds``."""
+    buffer = _thread_buffer()
+    key = (name, size_bucket(size))
+    histogram = buffer.get(key)
+    if histogram is None:
+        histogram = buffer[key] = Histogram(DURATION_BUCKETS)
+    histogram.observe(seconds)
+
+    if time.monotonic() - _last_flush >= settings.FUNCTION_TIMING_FLUSH_SECONDS:
+        flush(blocking=False)
+
+
+def timed(size=None, name=None):
+    """
+    Decorator recording a latency histogram for the wrapped function.
+
+    ``size`` is called with the function's arguments and returns the input
+    size to bucket by; without it every call lands in one bucket.
+    """
+    def decorator(func):
+        if not settings.FUNCTION_TIMING_ENABLED:
+            return func
+        label = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                observe(label, size(*args, **kwargs) if size else 0, elapsed)
+        return wrapper
+    return decorator
+
+
+def sized(value):
+    """Length of ``value`` if it has one, else 0 (e.g. for generators)."""
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def snapshot():
+    """Merge all thread buffers into JSON-friendly series."""
+    with _buffers_lock:
+        buffers = list(_buffers)
+
+    merged = {}
+    for buffer in buffers:
+        # Copy first: the owning thread may add keys while we read
+        for key, histogram in list(buffer.items()):
+            total = merged.get(key)
+            if total is None:
+                total = merged[key] = Histogram(DURATION_BUCKETS)
+            total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+            total.sum += histogram.sum
+            total.count += histogram.count
+
+    return [
+        {
+            'function': name,
+            'size_le': size,
+            'counts': histogram.counts,
+            'sum': histogram.sum,
+            'count': histogram.count,
+        }
+        for (name, size), histogram in sorted(merged.items())
+    ]
+
+
+def snapshot_path(pid=None):
+    return os.path.join(str(settings.FUNCTION_TIMING_DIR), f'timings-{pid or os.getpid()}.json')
+
+
+def flush(blocking=True):
+    """Write this process's snapshot, replacing the previous one."""
+    global _last_flush
+    if not _flush_lock.acquire(blocking=blocking):
+        return
+    try:
+        _last_flush = time.monotonic()
+        series = snapshot()
+        if not series:
+            return
+        path = snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f'{path}.part'
+        with open(partial, 'w') as handle:
+            json.dump({
+                'pid': os.getpid(),
+                'written_at': time.time(),
+                'buckets': DURATION_BUCKETS,
+                'series': series,
+            }, handle)
+        os.replace(partial, path)
+    finally:
+        _flush_lock.release()
+
+
+def load_snapshots():
+    """Merge the snapshot files of every process into ``{(function, size_le): Histogram}``."""
+    merged = {}
+    for path in glob.glob(os.path.join(str(settings.FUNCTION_TIMING_DIR), 'timings-*.json')):
+        with open(path) as handle:
+            data = json.load(handle)
+        if tuple(data['buckets']) != DURATION_BUCKETS:
+            continue
+        for series in data['series']:
+            key = (series['function'], series['size_le'])
+            total = merged.get(key)
+            if total is None:
+                total = merged[key] = Histogram(DURATION_BUCKETS)
+            total.counts = [a + b for a, b in zip(total.counts, series['counts'])]
+            total.sum += series['sum']
+            total.count += series['count']
+    return merged
+
+
+def quantile(histogram, q):
+    """Upper bound of the bucket holding the ``q`` quantile."""
+    target = q * histogram.count
+    running = 0
+    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        running += count
+        if running >= target:
+            return bound
+    return float('inf')
+
+
+def reset():
+    """Drop in-memory timings and delete all snapshot files."""
+    with _buffers_lock:
+        for buffer in _buffers:
+            buffer.clear()
+    for path in glob.glob(os.path.join(str(settings.FUNCTION_TIMING_DIR), 'timings-*.json')):
+        os.remove(path)
+
+
+if settings.FUNCTION_TIMING_ENABLED:
+    atexit.register(flush)
@@ -0,0 +1,167 @@
+"""
+Live dashboard updates over server-sent events.
+
+An open dashboard subscribes to ``/dashboard/stream/``. Saving a user's
+profile, tasks, revisions or pomodoros (see ``planner.signals``) notifies
+that user's streams once the transaction commits. Each stream then
+recomputes the dashboard numbers and sends only the ones that changed, so
+the page updates in place instead of being reloaded.
+
+The pub/sub is in-process: a local run needs no broker, but a stream only
+hears about writes handled by the same process. Deployments with several
+worker processes should route ``/dashboard/stream/`` and the write paths to
+one ASGI process, or replace ``Broker`` with a shared one (Redis pub/sub
+has the same subscribe/publish shape).
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import sharding
+from .ai_utils import calculate_productivity_score
+
+# Send a comment this often so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+# End a stream after this long and let EventSource reconnect, so streams
+# whose client went away without the server noticing don't live forever
+STREAM_MAX_SECONDS = 300
+# How long the browser waits before reconnecting
+RECONNECT_MS = 3000
+# Wait this long after a notification for the rest of the write's signals
+COALESCE_SECONDS = 0.05
+
+
+class Broker:
+    """Per-user fan-out of notifications to the event loops serving streams."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id):
+        """Wake every stream of ``user_id``; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_wake, queue)
+
+
+def _wake(queue):
+    # One pending wake-up is enough; the stream recomputes everything anyway
+    if not queue.full():
+        queue.put_nowait(True)
+
+
+broker = Broker()
+
+
+def notify(user_id, using):
+    """Tell ``user_id``'s open dashboards to refresh once the current transaction commits."""
+    if broker.has_subscribers(user_id):
+        transaction.on_commit(lambda: broker.publish(user_id), using=using)
+
+
+def dashboard_snapshot(user):
+    """The dashboard numbers that change as the user studies."""
+    from .models import PomodoroSession, RevisionTask, StudyTask, Topic, UserProfile
+
+    today = timezone.now().date()
+    with sharding.for_user(user):
+        profile = UserProfile.objects.only('total_xp', 'current_streak', 'longest_streak').get(user=user)
+        today_pomodoros = PomodoroSession.objects.filter(user=user, started_at__date=today, completed=True).count()
+        tasks_completed_today = StudyTask.objects.filter(user=user, scheduled_date=today, status='completed').count()
+        revisions_done_today = RevisionTask.objects.filter(user=user, completed_at__date=today).count()
+        topics = Topic.objects.filter(subject__user=user).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(is_completed=True))
+        )
+        upcoming_revisions = [
+            {
+                'topic': revision.topic.name,
+                'type': revision.get_revision_type_display(),
+                'date': date_format(revision.scheduled_date),
+            }
+            for revision in RevisionTask.objects.filter(
+                user=user,
+                is_completed=False,
+                scheduled_date__gte=today
+            ).select_related('topic').only(
+                'revision_type', 'scheduled_date', 'topic__name'
+            ).order_by('scheduled_date')[:5]
+        ]
+
+    completion = topics['completed'] / topics['total'] * 100 if topics['total'] else 0
+    return {
+        'total_xp': profile.total_xp,
+        'current_streak': profile.current_streak,
+        'longest_streak': profile.longest_streak,
+        'today_pomodoros': today_pomodoros,
+        'completed_topics': topics['completed'],
+        'total_topics': topics['total'],
+        'completion_percentage': round(completion, 1),
+        'productivity_score': calculate_productivity_score(
+            today_pomodoros, tasks_completed_today, revisions_done_today
+        ),
+        'upcoming_revisions': upcoming_revisions,
+    }
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+async def dashboard_events(user):
+    """
+    Yield server-sent events for ``user``'s dashboard: the current numbers
+    first, then the ones that changed after each notification.
+    """
+    queue = broker.subscribe(user.pk)
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    sent = {}
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        while True:
+            snapshot = await sync_to_async(dashboard_snapshot)(user)
+            delta = {key: value for key, value in snapshot.items() if sent.get(key) != value}
+            if delta:
+                sent = snapshot
+                yield format_event('delta', delta)
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=min(HEARTBEAT_SECONDS, remaining))
+                    break
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+            # A single write saves several rows; let their notifications land first
+            await asyncio.sleep(COALESCE_SECONDS)
+            if not queue.empty():
+                queue.get_nowait()
+    finally:
+        broker.unsubscribe(user.pk, queue)
@@ -0,0 +1,25 @@
+"""
+Fill in GeneratedQuestion.user and .subject for questions created before
+they were denormalized.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Q, Subquery
+
+from planner import sharding
+from planner.models import GeneratedQuestion, Topic
+
+
+class Command(BaseCommand):
+    help = 'Copy each question\'s owner and subject from its topic onto GeneratedQuestion'
+
+    def handle(self, *args, **options):
+        updated = 0
+        for _ in sharding.each_database():
+            topic = Topic.objects.filter(pk=OuterRef('topic_id'))
+            updated += GeneratedQuestion.objects.filter(
+                Q(user__isnull=True) | Q(subject__isnull=True)
+            ).update(
+                user_id=Subquery(topic.values('subject__user_id')[:1]),
+                subject_id=Subquery(topic.values('subject_id')[:1])
+            )
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} questions.'))
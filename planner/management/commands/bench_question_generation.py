@@ -0,0 +1,61 @@
+"""
+Benchmark concurrent question generation against a backend with simulated latency.
+"""
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from planner.question_backends import LocalBackend, generate_question_batches
+
+
+class SlowBackend(LocalBackend):
+    """LocalBackend that sleeps like a remote LLM call before answering."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def generate(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().generate(*args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = 'Compare question generation wall time across concurrency limits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.5,
+                            help='Simulated seconds per backend call (default: 0.5)')
+        parser.add_argument('--topics', type=int, default=8,
+                            help='Number of topics to generate questions for (default: 8)')
+        parser.add_argument('--questions', type=int, default=20,
+                            help='Questions per topic (default: 20)')
+        parser.add_argument('--chunk-size', type=int, default=5)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+
+    def handle(self, *args, **options):
+        backend = SlowBackend(options['latency'])
+        requests = [
+            (f'Topic {i}', 'mcq', 'medium', options['questions'])
+            for i in range(options['topics'])
+        ]
+        total = options['topics'] * options['questions']
+        self.stdout.write(
+            f"{total} questions, {options['latency']}s per call, "
+            f"chunks of {options['chunk_size']}"
+        )
+
+        for concurrency in options['concurrency']:
+            start = time.perf_counter()
+            results = generate_question_batches(
+                requests,
+                backend=backend,
+                concurrency=concurrency,
+                chunk_size=options['chunk_size']
+            )
+            elapsed = time.perf_counter() - start
+            generated = sum(len(questions) for questions in results)
+            self.stdout.write(
+                f"concurrency={concurrency:<4} {elapsed:6.2f} s  "
+                f"{generated / elapsed:8.1f} questions/s"
+            )
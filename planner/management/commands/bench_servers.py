@@ -0,0 +1,243 @@
+"""
+Load-test the JSON endpoints under WSGI and ASGI servers on this machine.
+
+Each server is started on a free local port with the same number of worker
+processes: gunicorn with threaded workers for WSGI, uvicorn for ASGI. A
+benchmark user is logged in, then ``--concurrency`` keep-alive connections
+send requests for ``--seconds``: mostly ``analytics/data/`` polls, with
+``--write-ratio`` of them logging a pomodoro. Throughput, latency
+percentiles, errors, and the resident and peak memory of the server's
+processes are reported per server. The benchmark user and everything it
+logged are deleted at the end.
+"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from random import Random
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from planner import sharding
+from planner.models import Subject, Topic, UserProfile
+
+SERVERS = {
+    'wsgi': lambda port, workers, threads: [
+        sys.executable, '-m', 'gunicorn', 'study_planner.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+        '--log-level', 'warning',
+    ],
+    'asgi': lambda port, workers, threads: [
+        sys.executable, '-m', 'uvicorn', 'study_planner.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid):
+    """Return ``pid`` and the ids of all its descendants (Linux only)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                parent = int(handle.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def memory_mb(pid):
+    """Sum the current (VmRSS) and peak (VmHWM) resident memory of a process tree, in MB."""
+    rss = peak = 0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/status') as handle:
+                for line in handle:
+                    if line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('VmHWM:'):
+                        peak += int(line.split()[1])
+        except OSError:
+            continue
+    return rss / 1024, peak / 1024
+
+
+async def fetch(reader, writer, request):
+    """Send one HTTP/1.1 request on an open connection; returns (status, keep_alive)."""
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON endpoint throughput and worker memory between WSGI (gunicorn) and ASGI (uvicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server (default: 2)')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Threads per gunicorn worker (default: 8)')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Concurrent client connections (default: 64)')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Load duration per server (default: 10)')
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help='Fraction of requests that log a pomodoro (default: 0.1)')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError('bench_servers reads process memory from /proc and needs Linux.')
+
+        user = User.objects.create_user(f'bench_servers_{int(time.time())}', password=None)
+        try:
+            with sharding.for_user(user):
+                UserProfile.objects.create(user=user)
+                subject = Subject.objects.create(user=user, name='Benchmarks')
+                topic = Topic.objects.create(subject=subject, chapter='Chapter 1', name='Load testing')
+            client = Client()
+            client.force_login(user)
+            csrf_token = get_random_string(CSRF_SECRET_LENGTH, CSRF_ALLOWED_CHARS)
+            cookies = (
+                f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}; '
+                f'{settings.CSRF_COOKIE_NAME}={csrf_token}'
+            )
+            body = f'topic_id={topic.pk}&duration=25'.encode()
+            requests = {
+                'read': (
+                    f'GET /analytics/data/?days=30 HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookies}\r\n\r\n'
+                ).encode(),
+                'write': (
+                    f'POST /pomodoro/log/ HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookies}\r\n'
+                    f'X-CSRFToken: {csrf_token}\r\nContent-Type: application/x-www-form-urlencoded\r\n'
+                    f'Content-Length: {len(body)}\r\n\r\n'
+                ).encode() + body,
+            }
+
+            results = []
+            for server in options['servers']:
+                self.stdout.write(f'Running {server}...')
+                results.append((server, self.run_server(server, requests, options)))
+        finally:
+            user.delete()
+
+        header = (
+            f"{'server':<7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'errors':>7} {'idle MB':>8} {'RSS MB':>8} {'peak MB':>8}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for server, stats in results:
+            timings = stats['timings']
+            self.stdout.write(
+                f"{server:<7} {len(timings) / stats['seconds']:>8.0f} {percentile(timings, 0.5):>8.1f} "
+                f"{percentile(timings, 0.95):>8.1f} {percentile(timings, 0.99):>8.1f} {stats['errors']:>7} "
+                f"{stats['idle_mb']:>8.0f} {stats['rss_mb']:>8.0f} {stats['peak_mb']:>8.0f}"
+            )
+
+    def run_server(self, server, requests, options):
+        port = free_port()
+        command = SERVERS[server](port, options['workers'], options['threads'])
+        # Own process group, so stopping the server also stops its workers
+        process = subprocess.Popen(command, start_new_session=True)
+        try:
+            self.wait_for(port, process)
+            asyncio.run(self.load(port, requests, options, warm_up=True))
+            idle_mb, _ = memory_mb(process.pid)
+            stats = asyncio.run(self.load(port, requests, options))
+            stats['idle_mb'] = idle_mb
+            stats['rss_mb'], stats['peak_mb'] = memory_mb(process.pid)
+            return stats
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+
+    def wait_for(self, port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with status {process.returncode}; is it installed?')
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    # Give the remaining workers a moment to finish importing
+                    time.sleep(1)
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'Server did not start listening on port {port} within {timeout} s')
+
+    async def load(self, port, requests, options, warm_up=False):
+        seconds = 1.0 if warm_up else options['seconds']
+        deadline = time.perf_counter() + seconds
+        timings = []
+        errors = 0
+
+        async def connection(seed):
+            nonlocal errors
+            rng = Random(seed)
+            reader = writer = None
+            while time.perf_counter() < deadline:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                started = time.perf_counter()
+                try:
+                    status, keep_alive = await fetch(reader, writer, requests[kind])
+                except (OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer.close()
+                    writer = None
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            if writer is not None:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(n) for n in range(options['concurrency'])))
+        return {'timings': timings, 'errors': errors, 'seconds': time.perf_counter() - started}
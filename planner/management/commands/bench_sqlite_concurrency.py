@@ -0,0 +1,202 @@
+"""
+Benchmark SQLite under concurrent writes, with and without the production profile.
+
+For each mode a fresh database file gets the planner schema and a few
+users. Then ``--threads`` threads run a mix of the app's hot write paths for
+``--seconds``: logging a pomodoro, completing a task, and syncing offline
+pomodoros, interleaved with dashboard-style reads. Throughput, write
+latency percentiles and "database is locked" errors are reported per mode.
+"""
+import copy
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from os import path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models import F
+from django.utils import timezone
+
+from planner.models import PomodoroSession, RevisionTask, StudyTask, Subject, Topic, UserProfile
+from planner.sqlite import write_transaction
+
+MODES = {
+    'default': 'django.db.backends.sqlite3',
+    'production': 'planner.sqlite',
+}
+ALIAS = 'bench_sqlite'
+TOPICS_PER_USER = 10
+TASKS_PER_USER = 200
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Compare SQLite write throughput and lock errors between the default and production profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent workers (default: 8)')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Run time per mode (default: 5)')
+        parser.add_argument('--write-ratio', type=float, default=0.5,
+                            help='Fraction of operations that write (default: 0.5)')
+        parser.add_argument('--users', type=int, default=20, help='Users the workers act as (default: 20)')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in options['modes']:
+            directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+            try:
+                self.open_database(MODES[mode], path.join(directory, 'bench.sqlite3'))
+                user_ids = self.seed(options['users'])
+                results.append((mode, self.run(user_ids, options)))
+            finally:
+                self.close_database()
+                shutil.rmtree(directory, ignore_errors=True)
+
+        header = (
+            f"{'mode':<11} {'ops/s':>8} {'writes/s':>9} {'reads/s':>8} "
+            f"{'write p50':>10} {'write p95':>10} {'write p99':>10} {'read p95':>9} {'errors':>7}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode, stats in results:
+            writes, reads, seconds = stats['writes'], stats['reads'], stats['seconds']
+            self.stdout.write(
+                f"{mode:<11} {(len(writes) + len(reads)) / seconds:>8.0f} {len(writes) / seconds:>9.0f} "
+                f"{len(reads) / seconds:>8.0f} {percentile(writes, 0.5):>8.1f}ms {percentile(writes, 0.95):>8.1f}ms "
+                f"{percentile(writes, 0.99):>8.1f}ms {percentile(reads, 0.95):>7.1f}ms {stats['errors']:>7}"
+            )
+
+    def open_database(self, engine, name):
+        config = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+        config.update(ENGINE=engine, NAME=name)
+        connections.settings[ALIAS] = config
+        call_command('migrate', database=ALIAS, run_syncdb=True, interactive=False, verbosity=0)
+
+    def close_database(self):
+        if ALIAS in connections.settings:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
+
+    def seed(self, count):
+        stamp = int(time.time())
+        User.objects.using(ALIAS).bulk_create([
+            User(username=f'bench_{stamp}_{n}', password='!') for n in range(count)
+        ])
+        user_ids = [user.pk for user in User.objects.using(ALIAS).filter(username__startswith=f'bench_{stamp}_')]
+        UserProfile.objects.using(ALIAS).bulk_create([UserProfile(user_id=pk) for pk in user_ids])
+        Subject.objects.using(ALIAS).bulk_create([Subject(user_id=pk, name='Benchmarks') for pk in user_ids])
+        subjects = dict(Subject.objects.using(ALIAS).values_list('user_id', 'pk'))
+        Topic.objects.using(ALIAS).bulk_create([
+            Topic(subject_id=subjects[pk], chapter='Chapter 1', name=f'Topic {t}')
+            for pk in user_ids for t in range(TOPICS_PER_USER)
+        ])
+        topics = {}
+        for topic_id, user_id in Topic.objects.using(ALIAS).values_list('pk', 'subject__user_id'):
+            topics.setdefault(user_id, []).append(topic_id)
+        today = timezone.now().date()
+        StudyTask.objects.using(ALIAS).bulk_create([
+            StudyTask(user_id=pk, topic_id=topics[pk][day % TOPICS_PER_USER], scheduled_date=today + timedelta(days=day))
+            for pk in user_ids for day in range(TASKS_PER_USER)
+        ])
+        self.topics = topics
+        return user_ids
+
+    # The operations below mirror the queries of the corresponding views
+
+    def log_pomodoro(self, rng, user_id):
+        with write_transaction(ALIAS):
+            PomodoroSession.objects.using(ALIAS).create(
+                user_id=user_id, topic_id=rng.choice(self.topics[user_id]), duration_minutes=25, completed=True
+            )
+            UserProfile.objects.using(ALIAS).filter(user_id=user_id).update(total_xp=F('total_xp') + 10)
+            PomodoroSession.objects.using(ALIAS).filter(user_id=user_id, completed=True).count()
+
+    def complete_task(self, rng, user_id):
+        task = StudyTask.objects.using(ALIAS).filter(user_id=user_id, status='pending').order_by('?').first()
+        if task is None:
+            return
+        with write_transaction(ALIAS):
+            task.status = 'completed'
+            task.completed_at = timezone.now()
+            task.save(using=ALIAS)
+            Topic.objects.using(ALIAS).filter(pk=task.topic_id).update(is_completed=True, completed_at=task.completed_at)
+            for revision_type, days in (('day1', 1), ('day3', 3), ('day7', 7), ('day30', 30)):
+                RevisionTask.objects.using(ALIAS).get_or_create(
+                    user_id=user_id, topic_id=task.topic_id, revision_type=revision_type,
+                    scheduled_date=task.completed_at.date() + timedelta(days=days)
+                )
+            UserProfile.objects.using(ALIAS).filter(user_id=user_id).update(total_xp=F('total_xp') + 50)
+
+    def sync_pomodoros(self, rng, user_id):
+        # Reads before it writes, the pattern that deferred transactions handle worst
+        with write_transaction(ALIAS):
+            PomodoroSession.objects.using(ALIAS).filter(user_id=user_id, completed=True).count()
+            PomodoroSession.objects.using(ALIAS).bulk_create([
+                PomodoroSession(user_id=user_id, topic_id=rng.choice(self.topics[user_id]),
+                                duration_minutes=25, completed=True)
+                for _ in range(3)
+            ])
+            UserProfile.objects.using(ALIAS).filter(user_id=user_id).update(total_xp=F('total_xp') + 30)
+
+    def read_dashboard(self, rng, user_id):
+        today = timezone.now().date()
+        UserProfile.objects.using(ALIAS).get(user_id=user_id)
+        list(StudyTask.objects.using(ALIAS).filter(user_id=user_id, scheduled_date=today))
+        PomodoroSession.objects.using(ALIAS).filter(user_id=user_id, completed=True).count()
+        Topic.objects.using(ALIAS).filter(subject__user_id=user_id, is_completed=True).count()
+
+    def run(self, user_ids, options):
+        writes_ops = [self.log_pomodoro, self.log_pomodoro, self.complete_task, self.sync_pomodoros]
+        lock = threading.Lock()
+        stats = {'writes': [], 'reads': [], 'errors': 0}
+        start_line = threading.Barrier(options['threads'] + 1)
+        deadline = [0.0]
+
+        def worker(seed):
+            rng = random.Random(seed)
+            writes, reads, errors = [], [], 0
+            start_line.wait()
+            try:
+                while time.perf_counter() < deadline[0]:
+                    user_id = rng.choice(user_ids)
+                    is_write = rng.random() < options['write_ratio']
+                    op = rng.choice(writes_ops) if is_write else self.read_dashboard
+                    started = time.perf_counter()
+                    try:
+                        op(rng, user_id)
+                    except OperationalError:
+                        # "database is locked", after waiting out the busy timeout
+                        errors += 1
+                        continue
+                    (writes if is_write else reads).append((time.perf_counter() - started) * 1000)
+            finally:
+                connections[ALIAS].close()
+                with lock:
+                    stats['writes'] += writes
+                    stats['reads'] += reads
+                    stats['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        deadline[0] = started + options['seconds']
+        start_line.wait()
+        for thread in threads:
+            thread.join()
+        stats['seconds'] = time.perf_counter() - started
+        return stats
@@ -0,0 +1,81 @@
+"""
+Benchmark the streaming syllabus parser on a synthetic course catalog.
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from planner.ai_utils import iter_topics
+
+
+def synthetic_catalog(size_bytes):
+    """Yield lines of a synthetic catalog until roughly ``size_bytes`` are produced."""
+    produced = 0
+    subject_no = 0
+    while produced < size_bytes:
+        subject_no += 1
+        block = [f"SUBJECT: COURSE {subject_no}\n"]
+        for unit in range(1, 9):
+            block.append(f"Unit {unit}: Foundations of area {subject_no}.{unit}\n")
+            for topic in range(1, 13):
+                block.append(f"{topic}. Advanced analysis of concept {subject_no}-{unit}-{topic}\n")
+            block.append("Recommended reading and supplementary material for this unit.\n")
+        for line in block:
+            produced += len(line)
+            yield line
+
+
+class _counting:
+    """Iterator wrapper that counts the lines passing through it."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._iterator)
+        self.count += 1
+        return line
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and peak memory of the streaming syllabus parser'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, default=50,
+                            help='Size of the synthetic catalog in megabytes (default: 50)')
+        parser.add_argument('--skip-memory', action='store_true',
+                            help='Skip the traced pass that measures peak memory')
+
+    def handle(self, *args, **options):
+        size_bytes = int(options['size_mb'] * 1024 * 1024)
+
+        topics = 0
+        counted = _counting(synthetic_catalog(size_bytes))
+        start = time.perf_counter()
+        for _ in iter_topics(counted):
+            topics += 1
+        elapsed = time.perf_counter() - start
+        lines = counted.count
+
+        self.stdout.write(f"Catalog size:     {options['size_mb']:.1f} MB ({lines:,} lines)")
+        self.stdout.write(f"Topics extracted: {topics:,}")
+        self.stdout.write(f"Elapsed:          {elapsed:.2f} s")
+        self.stdout.write(f"Throughput:       {lines / elapsed:,.0f} lines/s "
+                          f"({options['size_mb'] / elapsed:.1f} MB/s)")
+
+        if options['skip_memory']:
+            return
+
+        # tracemalloc slows allocation down, so memory is measured in its own pass
+        tracemalloc.start()
+        for _ in iter_topics(synthetic_catalog(size_bytes)):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"Peak memory:      {peak / 1024:,.1f} KiB")
+
@@ -0,0 +1,71 @@
+"""
+Benchmark vectorized topic-model inference against the keyword heuristic.
+"""
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner import topic_model
+from planner.ai_utils import _difficulty_cache, predict_topic_difficulties
+
+WORDS = [
+    'advanced', 'introduction', 'linear', 'equations', 'organic', 'chemistry',
+    'quantum', 'mechanics', 'cell', 'biology', 'probability', 'theorem', 'proof',
+    'analysis', 'basic', 'thermodynamics', 'vectors', 'integration', 'history',
+    'grammar', 'overview', 'complex', 'numbers', 'genetics', 'optics',
+]
+
+
+def synthetic_topics(count, seed=0):
+    """Return ``count`` random ``(name, chapter)`` pairs with a plausible vocabulary."""
+    rng = random.Random(seed)
+    return [
+        (' '.join(rng.choices(WORDS, k=rng.randint(2, 5))),
+         f"Unit {rng.randint(1, 12)} {rng.choice(WORDS)}")
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Measure topics scored per second by the local topic model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topics', type=int, default=100000,
+                            help='Number of synthetic topics to score (default: 100000)')
+        parser.add_argument('--train-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if topic_model.np is None:
+            raise CommandError('NumPy is required to benchmark the topic model.')
+
+        train_topics = synthetic_topics(options['train_size'], seed=1)
+        difficulties = [min(10, 2 + name.count(' ') * 2) for name, _ in train_topics]
+        hours = [d * 0.4 for d in difficulties]
+
+        start = time.perf_counter()
+        model = topic_model.train(train_topics, difficulties, hours)
+        self.stdout.write(f"Trained on {len(train_topics):,} topics in {time.perf_counter() - start:.2f} s")
+
+        # Round-trip through disk so inference runs on the memory-mapped weights
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'topic_model.npy')
+            model.save(path)
+            model = topic_model.load_model(path)
+
+            topics = synthetic_topics(options['topics'])
+            start = time.perf_counter()
+            model.predict(topics)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"Model:     {len(topics) / elapsed:,.0f} topics/s ({elapsed:.2f} s)")
+
+            # Release the mapping before the directory is removed
+            del model
+
+        _difficulty_cache.clear()
+        start = time.perf_counter()
+        predict_topic_difficulties(topics)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Heuristic: {len(topics) / elapsed:,.0f} topics/s ({elapsed:.2f} s, cold cache)")
@@ -0,0 +1,191 @@
+"""
+Benchmark every planner URL through the test client.
+
+Each URL in ``planner/urls.py`` is requested repeatedly as one user, and
+p50/p95 latency and SQL query counts are reported per view. Results can be
+saved as a JSON baseline and compared against a previous run. All requests
+run inside a transaction that is rolled back, so views that change data
+(completing a task, logging a pomodoro) leave the database untouched.
+"""
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from planner import sharding, urls as planner_urls
+from planner.models import GeneratedQuestion, RevisionTask, StudyTask, Subject, SyllabusUpload, Topic
+
+# Views that would end the benchmark session
+SKIPPED_VIEWS = {'logout'}
+
+# Where to find an object for URLs that take an id, by URL name prefix
+OBJECT_SOURCES = [
+    ('subject_', lambda user: Subject.objects.filter(user=user)),
+    ('topic_', lambda user: Topic.objects.filter(subject__user=user)),
+    ('task_', lambda user: StudyTask.objects.filter(user=user, status='pending')),
+    ('revision_', lambda user: RevisionTask.objects.filter(user=user, is_completed=False)),
+    ('question_detail', lambda user: GeneratedQuestion.objects.filter(user=user)),
+    ('process_syllabus', lambda user: SyllabusUpload.objects.filter(user=user)),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measure p50/p95 latency and query counts for every planner URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to run as (default: the user with the most topics)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL (default: 20)')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Compare against a baseline JSON file written by --output')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Flag views whose p50 grew by more than this percentage (default: 20)')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        # The user's data may live on a shard rather than in default
+        databases = list(dict.fromkeys([DEFAULT_DB_ALIAS, sharding.database_for_user(user.pk)]))
+        results = {}
+        with self.rolled_back(databases), sharding.for_user(user):
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            for pattern in planner_urls.urlpatterns:
+                name = pattern.name
+                if name in SKIPPED_VIEWS:
+                    continue
+                url = self.build_url(name, pattern, user)
+                if url is None:
+                    self.stdout.write(f'skip {name}: no object to use for its URL')
+                    continue
+                # A savepoint per URL, so a view that fails a query can't poison the rest
+                with self.rolled_back(databases):
+                    results[f'{planner_urls.app_name}:{name}'] = self.measure(
+                        client, url, options['iterations'], databases
+                    )
+
+        report = {
+            'meta': {
+                'user': user.username,
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'created_at': timezone.now().isoformat(),
+            },
+            'views': results,
+        }
+        self.print_report(results, baseline, options['threshold'])
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {username!r}')
+        # Shards hold copies of their users, so each can be asked for its busiest one
+        candidates = [
+            User.objects.using(alias).annotate(
+                topic_count=Count('subjects__topics')
+            ).order_by('-topic_count', 'pk').first()
+            for alias in sharding.each_database()
+        ]
+        candidates = [user for user in candidates if user is not None]
+        if not candidates:
+            raise CommandError('No users to benchmark as; run seed_data first')
+        best = max(candidates, key=lambda user: (user.topic_count, -user.pk))
+        return User.objects.get(pk=best.pk)
+
+    def rolled_back(self, databases):
+        """Run a block in a transaction on every database, rolling all of them back."""
+        stack = ExitStack()
+        for alias in databases:
+            stack.enter_context(transaction.atomic(using=alias))
+            stack.callback(transaction.set_rollback, True, using=alias)
+        return stack
+
+    def build_url(self, name, pattern, user):
+        kwargs = {}
+        for key in pattern.pattern.converters:
+            source = next((get for prefix, get in OBJECT_SOURCES if name.startswith(prefix)), None)
+            pk = source(user).values_list('pk', flat=True).first() if source else None
+            if pk is None:
+                return None
+            kwargs[key] = pk
+        return reverse(f'{planner_urls.app_name}:{name}', kwargs=kwargs)
+
+    def measure(self, client, url, iterations, databases):
+        # Warm-up request, which also tells us whether the view only takes POST
+        method = 'get'
+        if client.get(url).status_code == 405:
+            method = 'post'
+        request = getattr(client, method)
+
+        timings, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in databases]
+                start = time.perf_counter()
+                response = request(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(sum(len(c.captured_queries) for c in captured))
+            statuses.add(response.status_code)
+
+        return {
+            'url': url,
+            'method': method.upper(),
+            'status': sorted(statuses),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def print_report(self, results, baseline, threshold):
+        previous = baseline['views'] if baseline else {}
+        header = f"{'view':<32} {'method':<6} {'status':<9} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}"
+        if baseline:
+            header += f" {'Δp50':>8} {'Δqueries':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        regressions = 0
+        for name, row in results.items():
+            status = ','.join(str(code) for code in row['status'])
+            line = (
+                f"{name:<32} {row['method']:<6} {status:<9} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['queries']:>8}"
+            )
+            old = previous.get(name)
+            if old:
+                change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+                query_change = row['queries'] - old['queries']
+                line += f' {change:>+7.1f}% {query_change:>+9d}'
+                if change > threshold or query_change > 0:
+                    regressions += 1
+                    line = self.style.WARNING(line)
+            self.stdout.write(line)
+
+        if baseline:
+            message = f'{regressions} views regressed against the baseline.'
+            self.stdout.write(self.style.WARNING(message) if regressions else self.style.SUCCESS(message))
@@ -0,0 +1,31 @@
+"""
+Sweep existing question banks for near-duplicate questions.
+"""
+from django.core.management.base import BaseCommand
+
+from planner import sharding
+from planner.dedup import sweep_topic
+from planner.models import GeneratedQuestion
+
+
+class Command(BaseCommand):
+    help = 'Delete near-duplicate generated questions within each topic, keeping the oldest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='Similarity at or above which questions are duplicates '
+                                 '(default: QUESTION_DEDUP_THRESHOLD)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        topics = duplicates = 0
+        for _ in sharding.each_database():
+            topic_ids = GeneratedQuestion.objects.order_by().values_list('topic_id', flat=True).distinct()
+            for topic_id in list(topic_ids):
+                duplicates += sweep_topic(topic_id, options['threshold'], options['dry_run'])
+                topics += 1
+
+        verb = 'Found' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {duplicates} near-duplicate questions across {topics} topics.'
+        ))
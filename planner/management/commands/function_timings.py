@@ -0,0 +1,70 @@
+"""
+Print latency histograms recorded by @timed functions, per input size.
+"""
+import json
+import math
+
+from django.core.management.base import BaseCommand
+
+from planner import instrumentation
+
+# Growth exponent (log time / log size) between neighbouring size buckets above
+# which a function is flagged; 1.0 is linear, 2.0 quadratic
+SUPERLINEAR_EXPONENT = 1.5
+
+
+def _format_seconds(seconds):
+    if seconds == float('inf'):
+        return '>10s'
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.0f}µs'
+    if seconds < 1:
+        return f'{seconds * 1e3:.1f}ms'
+    return f'{seconds:.2f}s'
+
+
+class Command(BaseCommand):
+    help = 'Show timing histograms of instrumented functions, bucketed by input size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print raw merged series as JSON')
+        parser.add_argument('--reset', action='store_true', help='Delete all recorded snapshots')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            instrumentation.reset()
+            self.stdout.write(self.style.SUCCESS('Deleted timing snapshots.'))
+            return
+
+        merged = instrumentation.load_snapshots()
+        if not merged:
+            self.stdout.write('No timings recorded. Set FUNCTION_TIMING_ENABLED=1 and exercise the app.')
+            return
+
+        if options['json']:
+            self.stdout.write(json.dumps([
+                {'function': name, 'size_le': size, 'counts': h.counts, 'sum': h.sum, 'count': h.count}
+                for (name, size), h in sorted(merged.items())
+            ], indent=2))
+            return
+
+        header = f"{'function':<50} {'size<=':>8} {'calls':>8} {'mean':>9} {'p50<=':>9} {'p95<=':>9} {'p99<=':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        previous = None
+        for (name, size), histogram in sorted(merged.items()):
+            mean = histogram.sum / histogram.count
+            line = (
+                f'{name[-50:]:<50} {size:>8} {histogram.count:>8} {_format_seconds(mean):>9} '
+                f'{_format_seconds(instrumentation.quantile(histogram, 0.5)):>9} '
+                f'{_format_seconds(instrumentation.quantile(histogram, 0.95)):>9} '
+                f'{_format_seconds(instrumentation.quantile(histogram, 0.99)):>9}'
+            )
+            # Compare with the next smaller size bucket of the same function
+            if previous and previous[0] == name and previous[1] > 0 and previous[2] > 0:
+                exponent = math.log(mean / previous[2]) / math.log(size / previous[1])
+                if exponent > SUPERLINEAR_EXPONENT:
+                    line = self.style.WARNING(f'{line}  time grows ~size^{exponent:.1f}')
+            self.stdout.write(line)
+            previous = (name, size, mean)
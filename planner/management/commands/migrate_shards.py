@@ -0,0 +1,19 @@
+"""
+Apply migrations to the default database and every shard.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from planner import sharding
+
+
+class Command(BaseCommand):
+    help = 'Run migrate on the default database and on each database in SHARD_DATABASES'
+
+    def handle(self, *args, **options):
+        for alias in [DEFAULT_DB_ALIAS] + sharding.shard_aliases():
+            self.stdout.write(f'Migrating {alias}')
+            call_command('migrate', database=alias, interactive=False,
+                         verbosity=options['verbosity'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Migrated {1 + len(sharding.shard_aliases())} databases.'))
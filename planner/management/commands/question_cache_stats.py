@@ -0,0 +1,26 @@
+"""
+Show hit-rate statistics for the generated-question cache.
+"""
+from django.core.management.base import BaseCommand
+
+from planner.models import QuestionCache
+from planner.question_cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Print question cache size and hit rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Delete every cached entry')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = QuestionCache.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} cache entries.'))
+            return
+
+        stats = cache_stats()
+        self.stdout.write(f"Entries:  {stats['entries']:,}")
+        self.stdout.write(f"Hits:     {stats['hits']:,}")
+        self.stdout.write(f"Misses:   {stats['misses']:,}")
+        self.stdout.write(f"Hit rate: {stats['hit_rate']:.1%}")
@@ -0,0 +1,42 @@
+"""
+Move users whose data is not on the shard the hash ring assigns them.
+
+Run after adding shards to SHARD_DATABASES (and migrating them), or after
+switching an existing deployment to sharded mode, in which case the data
+still in ``default`` is moved out. With consistent hashing, adding a shard
+to N existing ones moves roughly 1/(N+1) of the users.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from planner import sharding
+
+
+class Command(BaseCommand):
+    help = 'Move each user\'s planner data to the shard it hashes to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report which users would move')
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('Sharding is off; set SHARD_COUNT first.')
+
+        users = rows = 0
+        for source in [DEFAULT_DB_ALIAS] + sharding.shard_aliases():
+            for user_id in sorted(sharding.users_in(source)):
+                target = sharding.shard_for_user(user_id)
+                if target == source:
+                    continue
+                users += 1
+                if options['dry_run']:
+                    self.stdout.write(f'user {user_id}: {source} -> {target}')
+                    continue
+                moved = sharding.move_user(user_id, source, target)
+                rows += moved
+                self.stdout.write(f'user {user_id}: moved {moved:,} rows {source} -> {target}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{users} users would move.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Moved {users} users ({rows:,} rows).'))
@@ -0,0 +1,18 @@
+"""
+Rebuild the full-text search index from scratch.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from planner import search, sharding
+
+
+class Command(BaseCommand):
+    help = 'Drop and repopulate the full-text index of topics, questions and task notes'
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            raise CommandError('Full-text search needs SQLite (FTS5) or PostgreSQL.')
+        total = 0
+        for alias in sharding.each_database():
+            total += search.rebuild_index(stdout=self.stdout, using=alias)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total:,} documents.'))
@@ -0,0 +1,42 @@
+"""
+Re-process syllabus uploads whose background worker was lost.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from planner import sharding
+from planner.tasks import claimable_uploads, process_upload
+
+
+class Command(BaseCommand):
+    help = ("Process uploads stuck in 'processing' past SYLLABUS_PROCESSING_TIMEOUT_MINUTES, "
+            "e.g. after a restart dropped the in-process queue")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the stale uploads')
+
+    def handle(self, *args, **options):
+        stale = []
+        for _ in sharding.each_database():
+            stale.extend(claimable_uploads().filter(status='processing').values_list('pk', 'user_id'))
+
+        processed = 0
+        for upload_id, user_id in stale:
+            if options['dry_run']:
+                self.stdout.write(f'Upload {upload_id} (user {user_id})')
+                continue
+            with sharding.for_user(user_id):
+                # Claim it again first, so a web process doing the same backs off
+                claimed = claimable_uploads().filter(pk=upload_id).update(
+                    status='processing',
+                    processing_started_at=timezone.now()
+                )
+            if claimed:
+                # Run inline: this process has no web server to host the pool
+                process_upload(upload_id, user_id)
+                processed += 1
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(stale)} stale uploads.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Re-processed {processed} stale uploads.'))
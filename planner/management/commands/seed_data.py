@@ -0,0 +1,231 @@
+"""
+Seed the database with synthetic users and study data for benchmarking.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from planner import sharding
+from planner.models import (
+    UserProfile, Subject, Topic, StudyTask, RevisionTask,
+    PomodoroSession, GeneratedQuestion
+)
+
+SUBJECTS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Geography',
+    'Economics', 'Computer Science', 'English Literature', 'Political Science',
+]
+CHAPTER_WORDS = [
+    'Foundations', 'Principles', 'Applications', 'Advanced Topics', 'Theory',
+    'Methods', 'Systems', 'Analysis', 'Structures', 'Dynamics',
+]
+TOPIC_WORDS = [
+    'equations', 'functions', 'reactions', 'cells', 'waves', 'energy', 'markets',
+    'algorithms', 'revolutions', 'climate', 'probability', 'vectors', 'genetics',
+    'thermodynamics', 'optics', 'trade', 'recursion', 'evolution', 'matrices', 'poetry',
+]
+COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#EC4899']
+REVISION_OFFSETS = [('day1', 1), ('day3', 3), ('day7', 7), ('day30', 30)]
+QUESTION_TYPES = ['mcq', 'short', 'long']
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+# Users generated and inserted per transaction
+USER_CHUNK = 200
+
+
+class IdAllocator:
+    """
+    Hands out primary keys so rows can reference each other before insert.
+    With sharding, keys are unique across all shards.
+    """
+
+    def __init__(self, models):
+        self.next_ids = {model: 1 for model in models}
+        for _ in sharding.each_database():
+            for model in models:
+                top = model.objects.aggregate(top=Max('pk'))['top'] or 0
+                self.next_ids[model] = max(self.next_ids[model], top + 1)
+
+    def __call__(self, model):
+        pk = self.next_ids[model]
+        self.next_ids[model] = pk + 1
+        return pk
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic users with subjects, topics, tasks, revisions, pomodoros and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of users to create (default: 100)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data')
+        parser.add_argument('--password', default='benchmark',
+                            help='Password for every seeded user (default: benchmark)')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.today = self.now.date()
+        self.password = make_password(options['password'])
+        self.ids = IdAllocator([
+            User, UserProfile, Subject, Topic, StudyTask, RevisionTask,
+            PomodoroSession, GeneratedQuestion
+        ])
+        prefix = f"seed{options['seed']}_{int(time.time())}"
+
+        totals = {}
+        start = time.perf_counter()
+        for offset in range(0, options['users'], USER_CHUNK):
+            count = min(USER_CHUNK, options['users'] - offset)
+            for db, rows in self.build_chunk(prefix, offset, count).items():
+                with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=db):
+                    if db != DEFAULT_DB_ALIAS:
+                        # Users live in default, with a copy on their shard
+                        User.objects.using(DEFAULT_DB_ALIAS).bulk_create(rows[User])
+                    for model, objects in rows.items():
+                        model.objects.using(db).bulk_create(objects)
+                        totals[model.__name__] = totals.get(model.__name__, 0) + len(objects)
+            self.stdout.write(f'{offset + count:,} users seeded ({time.perf_counter() - start:.1f} s)')
+
+        # Explicit primary keys leave sequences behind on PostgreSQL
+        for alias in dict.fromkeys([DEFAULT_DB_ALIAS] + sharding.shard_aliases()):
+            conn = connections[alias]
+            with conn.cursor() as cursor:
+                for sql in conn.ops.sequence_reset_sql(no_style(), list(self.ids.next_ids)):
+                    cursor.execute(sql)
+
+        elapsed = time.perf_counter() - start
+        total = sum(totals.values())
+        for name, count in totals.items():
+            self.stdout.write(f'  {name:<18} {count:>12,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {total:,} rows in {elapsed:.1f} s ({total / elapsed:,.0f} rows/s). '
+            f'Users are {prefix}_<n> with password "{options["password"]}". '
+            f'Run rebuild_search_index to make them searchable.'
+        ))
+
+    def build_chunk(self, prefix, offset, count):
+        """Build unsaved rows for ``count`` users, grouped by database, in insert order."""
+        chunks = {}
+        for n in range(offset, offset + count):
+            user_id = self.ids(User)
+            rows = chunks.setdefault(
+                sharding.database_for_user(user_id), {model: [] for model in self.ids.next_ids}
+            )
+            self.build_user(user_id, f'{prefix}_{n}', rows)
+        return chunks
+
+    def build_user(self, user_id, username, rows):
+        rng, ids = self.rng, self.ids
+        # How diligent this user is: drives completion rates and pomodoro volume
+        activity = rng.betavariate(2, 3)
+
+        user = User(id=user_id, username=username, email=f'{username}@example.com',
+                    password=self.password, date_joined=self.now - timedelta(days=rng.randint(30, 365)))
+        rows[User].append(user)
+
+        topics = []
+        for name in rng.sample(SUBJECTS, rng.randint(2, 7)):
+            subject = Subject(id=ids(Subject), user_id=user.id, name=name, color=rng.choice(COLORS))
+            rows[Subject].append(subject)
+            for c in range(rng.randint(2, 6)):
+                chapter = f'Chapter {c + 1}: {rng.choice(CHAPTER_WORDS)}'
+                for _ in range(rng.randint(2, 8)):
+                    difficulty = min(max(round(rng.gauss(5.5, 2)), 1), 10)
+                    words = rng.sample(TOPIC_WORDS, 2)
+                    topic = Topic(
+                        id=ids(Topic), subject_id=subject.id, chapter=chapter,
+                        name=f'{words[0].title()} and {words[1]}',
+                        difficulty_score=difficulty,
+                        estimated_hours=round(1.5 + (difficulty - 1) * 2.5 / 9, 1)
+                    )
+                    if rng.random() < activity:
+                        topic.is_completed = True
+                        topic.completed_at = self.now - timedelta(days=rng.randint(0, 60), hours=rng.randint(0, 23))
+                    rows[Topic].append(topic)
+                    topics.append(topic)
+
+        for topic in topics:
+            self.build_topic_rows(user, topic, activity, rows)
+
+        streak = 0
+        for days_ago in range(90):
+            if rng.random() >= activity:
+                continue
+            if days_ago == streak:
+                streak += 1
+            for _ in range(rng.randint(1, 8)):
+                started = datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time())
+                rows[PomodoroSession].append(PomodoroSession(
+                    id=ids(PomodoroSession), user_id=user.id,
+                    topic_id=rng.choice(topics).id if rng.random() < 0.8 else None,
+                    duration_minutes=rng.choice([25, 25, 25, 50]),
+                    started_at=timezone.make_aware(started + timedelta(minutes=rng.randint(6 * 60, 23 * 60))),
+                    completed=rng.random() < 0.9
+                ))
+
+        completed_topics = sum(topic.is_completed for topic in topics)
+        rows[UserProfile].append(UserProfile(
+            id=ids(UserProfile), user_id=user.id,
+            exam_date=self.today + timedelta(days=rng.randint(14, 180)),
+            daily_study_hours=rng.randint(2, 8),
+            total_xp=completed_topics * 50 + rng.randint(0, 2000),
+            current_streak=streak,
+            longest_streak=streak + rng.randint(0, 20),
+            last_study_date=self.today if streak else None,
+            theme_preference=rng.choice(['light', 'dark'])
+        ))
+
+    def build_topic_rows(self, user, topic, activity, rows):
+        rng, ids = self.rng, self.ids
+
+        # (user, topic, scheduled_date) is unique, so draw distinct days
+        for days in rng.sample(range(-60, 61), rng.randint(1, 2)):
+            scheduled = self.today + timedelta(days=days)
+            task = StudyTask(id=ids(StudyTask), user_id=user.id, topic_id=topic.id, scheduled_date=scheduled)
+            if topic.is_completed:
+                task.status = 'completed'
+                task.completed_at = topic.completed_at
+            elif scheduled < self.today and rng.random() > activity:
+                task.status = 'missed'
+            if rng.random() < 0.15:
+                task.notes = f'Review {topic.name.lower()} before the mock test'
+            rows[StudyTask].append(task)
+
+        if topic.is_completed:
+            completed_on = topic.completed_at.date()
+            for revision_type, days in REVISION_OFFSETS:
+                scheduled = completed_on + timedelta(days=days)
+                done = scheduled <= self.today and rng.random() < activity
+                rows[RevisionTask].append(RevisionTask(
+                    id=ids(RevisionTask), user_id=user.id, topic_id=topic.id,
+                    revision_type=revision_type, scheduled_date=scheduled, is_completed=done,
+                    completed_at=timezone.make_aware(datetime.combine(scheduled, datetime.min.time())) if done else None
+                ))
+
+        if rng.random() < 0.3:
+            for i in range(rng.randint(5, 20)):
+                question_type = rng.choices(QUESTION_TYPES, weights=[6, 3, 1])[0]
+                question = GeneratedQuestion(
+                    id=ids(GeneratedQuestion), topic_id=topic.id, user_id=user.id, subject_id=topic.subject_id,
+                    question_type=question_type,
+                    difficulty=rng.choices(DIFFICULTIES, weights=[3, 5, 2])[0],
+                    question_text=f'Question {i + 1} on {topic.name}: explain how {rng.choice(TOPIC_WORDS)} '
+                                  f'relates to {rng.choice(TOPIC_WORDS)}.',
+                    explanation=f'Tests understanding of {topic.name}.'
+                )
+                if question_type == 'mcq':
+                    question.option_a, question.option_b, question.option_c, question.option_d = (
+                        rng.sample(TOPIC_WORDS, 4)
+                    )
+                    question.correct_answer = rng.choice('ABCD')
+                else:
+                    question.correct_answer = f'A model answer about {topic.name}.'
+                rows[GeneratedQuestion].append(question)
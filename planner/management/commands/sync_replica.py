@@ -0,0 +1,54 @@
+"""
+Refresh the local SQLite read replica from the primary database.
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary to REPLICA_DB_PATH, once or every --every seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='Keep running and resync at this interval, in seconds')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('sync_replica copies SQLite databases; use streaming replication for PostgreSQL.')
+        if not settings.REPLICA_DB_PATH:
+            raise CommandError('Set REPLICA_DB_PATH to the file the replica should live in.')
+
+        while True:
+            start = time.perf_counter()
+            self.copy(str(primary['NAME']), settings.REPLICA_DB_PATH)
+            self.stdout.write(self.style.SUCCESS(
+                f'Replica synced to {settings.REPLICA_DB_PATH} in {time.perf_counter() - start:.2f} s'
+            ))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def copy(self, source_path, target_path):
+        # The backup API gives a consistent snapshot while the primary keeps
+        # taking writes; swapping the file in afterwards means readers never
+        # see a half-copied replica
+        partial = f'{target_path}.part'
+        if os.path.exists(partial):
+            os.remove(partial)
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(target)
+            # The copy inherits a WAL primary's journal mode, which a read-only
+            # connection can't open without the primary's -shm file
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        os.replace(partial, target_path)
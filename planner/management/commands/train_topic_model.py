@@ -0,0 +1,80 @@
+"""
+Train the local difficulty / study-hours model from completed topics.
+
+Both targets come from the pomodoro minutes logged on each topic: hours
+directly, and difficulty as the topic's percentile rank by those hours.
+The stored ``difficulty_score`` is not used, since it was written by the
+heuristic or a previous model. Accuracy is reported on a held-out split,
+and the saved model is then refit on every topic.
+"""
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, Sum
+
+from planner import sharding, topic_model
+from planner.models import Topic
+
+
+def mean_absolute_error(predicted, actual):
+    return sum(abs(p - a) for p, a in zip(predicted, actual)) / len(actual)
+
+
+class Command(BaseCommand):
+    help = 'Fit the topic difficulty and study-hours model on completed topics and their pomodoro minutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-samples', type=int, default=50,
+                            help='Refuse to train on fewer completed topics (default: 50)')
+        parser.add_argument('--epochs', type=int, default=150)
+        parser.add_argument('--holdout', type=float, default=0.2,
+                            help='Fraction of topics held out to measure accuracy (default: 0.2)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the held-out split')
+        parser.add_argument('--output', default=str(settings.TOPIC_MODEL_PATH),
+                            help='Where to write the weights (default: TOPIC_MODEL_PATH)')
+
+    def handle(self, *args, **options):
+        if topic_model.np is None:
+            raise CommandError('NumPy is required to train the topic model.')
+        if not 0 < options['holdout'] < 1:
+            raise CommandError('--holdout must be between 0 and 1.')
+
+        rows = []
+        for _ in sharding.each_database():
+            rows += Topic.objects.filter(is_completed=True).annotate(
+                minutes=Sum('pomodoro_sessions__duration_minutes',
+                            filter=Q(pomodoro_sessions__completed=True))
+            ).filter(minutes__gt=0).values_list('name', 'chapter', 'minutes')
+
+        if len(rows) < options['min_samples']:
+            raise CommandError(
+                f"Only {len(rows)} completed topics with logged pomodoros; "
+                f"need at least {options['min_samples']}."
+            )
+
+        topics = [(name, chapter) for name, chapter, _ in rows]
+        hours = [minutes / 60 for _, _, minutes in rows]
+        difficulties = topic_model.effort_difficulties(hours)
+
+        indices = list(range(len(rows)))
+        random.Random(options['seed']).shuffle(indices)
+        split = max(1, int(len(indices) * options['holdout']))
+        test, fit = indices[:split], indices[split:]
+
+        model = topic_model.train(
+            [topics[i] for i in fit], [difficulties[i] for i in fit], [hours[i] for i in fit],
+            epochs=options['epochs']
+        )
+        predicted_difficulty, predicted_hours = model.predict([topics[i] for i in test])
+        difficulty_mae = mean_absolute_error(predicted_difficulty, [difficulties[i] for i in test])
+        hours_mae = mean_absolute_error(predicted_hours, [hours[i] for i in test])
+
+        # The split was only for measuring; the saved model learns from every topic
+        model = topic_model.train(topics, difficulties, hours, epochs=options['epochs'])
+        model.save(options['output'])
+
+        self.stdout.write(self.style.SUCCESS(f"Trained on {len(rows):,} topics -> {options['output']}"))
+        self.stdout.write(
+            f"Held-out MAE ({len(test):,} topics): difficulty {difficulty_mae:.2f}, hours {hours_mae:.2f}"
+        )
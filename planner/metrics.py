@@ -0,0 +1,208 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+RequestMetricsMiddleware (see ``planner.middleware``) records, for every
+request, the wall time, number of SQL queries, time spent in SQL and
+response size, aggregated per resolved view name. Queries are also
+reduced to their shape (literals and IN-lists collapsed), and a shape that
+repeats REQUEST_METRICS_N_PLUS_ONE_THRESHOLD times within one request is
+counted and logged as a likely N+1 pattern.
+
+Aggregates are kept in process memory, so with several worker processes
+each one reports its own numbers.
+"""
+import hmac
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)', re.IGNORECASE)
+
+
+def sql_shape(sql):
+    """Reduce a query to its shape, so the same query with other values matches."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` holds values in ``(buckets[i-1], buckets[i]]``."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield ``(le, cumulative_count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else _format_number(bound)), total
+
+
+class ViewStats:
+    __slots__ = ('responses', 'duration', 'queries', 'sql_seconds', 'response_bytes', 'n_plus_one')
+
+    def __init__(self):
+        self.responses = Counter()
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.n_plus_one = 0
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - start
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def repeated_shapes(self, threshold):
+        """Return ``(shape, count)`` for shapes executed at least ``threshold`` times."""
+        shapes = Counter()
+        for sql, count in self.shapes.items():
+            shapes[sql_shape(sql)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def record(view, status, duration, recorder, response_bytes, n_plus_one_threshold):
+    """Fold one request into the per-view aggregates."""
+    repeated = recorder.repeated_shapes(n_plus_one_threshold)
+    for shape, count in repeated:
+        logger.warning('Possible N+1 in %s: %d queries shaped like %s', view, count, shape[:300])
+
+    with _lock:
+        stats = _stats.get(view)
+        if stats is None:
+            stats = _stats[view] = ViewStats()
+        stats.responses[status] += 1
+        stats.duration.observe(duration)
+        stats.queries.observe(recorder.count)
+        stats.sql_seconds += recorder.seconds
+        stats.response_bytes += response_bytes
+        stats.n_plus_one += len(repeated)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _histogram_lines(name, view, histogram):
+    label = f'view="{_escape(view)}"'
+    for le, count in histogram.cumulative():
+        yield f'{name}_bucket{{{label},le="{le}"}} {count}'
+    yield f'{name}_sum{{{label}}} {_format_number(histogram.sum)}'
+    yield f'{name}_count{{{label}}} {histogram.count}'
+
+
+def render():
+    """Return all aggregates in the Prometheus text exposition format."""
+    with _lock:
+        items = sorted(_stats.items())
+        lines = [
+            '# HELP planner_requests_total Requests handled, by view and status code.',
+            '# TYPE planner_requests_total counter',
+        ]
+        for view, stats in items:
+            for status, count in sorted(stats.responses.items()):
+                lines.append(f'planner_requests_total{{view="{_escape(view)}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP planner_request_duration_seconds Wall time spent handling a request.',
+            '# TYPE planner_request_duration_seconds histogram',
+        ]
+        for view, stats in items:
+            lines.extend(_histogram_lines('planner_request_duration_seconds', view, stats.duration))
+
+        lines += [
+            '# HELP planner_request_queries SQL queries executed per request.',
+            '# TYPE planner_request_queries histogram',
+        ]
+        for view, stats in items:
+            lines.extend(_histogram_lines('planner_request_queries', view, stats.queries))
+
+        simple = [
+            ('planner_request_sql_seconds_total', 'Time spent executing SQL.', 'sql_seconds'),
+            ('planner_response_bytes_total', 'Response body bytes sent.', 'response_bytes'),
+            ('planner_n_plus_one_total', 'Repeated query shapes that suggest an N+1 pattern.', 'n_plus_one'),
+        ]
+        for name, help_text, attr in simple:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for view, stats in items:
+                lines.append(f'{name}{{view="{_escape(view)}"}} {_format_number(getattr(stats, attr))}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def client_ip(request):
+    """
+    The address of the client, seen through METRICS_TRUSTED_PROXY_HOPS reverse
+    proxies. Entries further left in X-Forwarded-For are client-supplied and
+    can't be trusted. Returns None when there are fewer entries than proxies.
+    """
+    hops = settings.METRICS_TRUSTED_PROXY_HOPS
+    if hops <= 0:
+        return request.META.get('REMOTE_ADDR')
+    forwarded = [
+        address.strip()
+        for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+        if address.strip()
+    ]
+    return forwarded[-hops] if len(forwarded) >= hops else None
+
+
+def can_scrape(request):
+    """Whether ``request`` may read /metrics/: by bearer token, or from an allowed address."""
+    token = settings.METRICS_BEARER_TOKEN
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode()):
+            return True
+    return client_ip(request) in settings.METRICS_ALLOWED_IPS
@@ -0,0 +1,160 @@
+"""
+Request instrumentation middleware.
+"""
+import cProfile
+import random
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers, sharding
+from .profiling import code_key, save_profile
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per-view latency, SQL and response-size metrics.
+
+    Disabled unless REQUEST_METRICS_ENABLED is set, in which case Django
+    drops the middleware at startup and requests pay nothing for it.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.REQUEST_METRICS_N_PLUS_ONE_THRESHOLD
+
+    def __call__(self, request):
+        recorder = metrics.QueryRecorder()
+        start = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        metrics.record(view, response.status_code, duration, recorder, size, self.threshold)
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profile a request with cProfile and save the dump (see ``planner.profiling``).
+
+    Staff users turn it on per request with an ``X-Profile: 1`` header or a
+    ``?_profile=1`` query parameter. PROFILE_SAMPLE_RATE additionally
+    profiles that fraction of all requests. Must come after
+    AuthenticationMiddleware. Disabled unless PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+
+    def wants_profile(self, request):
+        requested = request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'
+        if requested and request.user.is_staff:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        response = profiler.runcall(self.get_response, request)
+        duration = perf_counter() - start
+
+        profile = save_profile(profiler, request, response, duration, code_key(self.get_response))
+        response['X-Profile-Id'] = profile.name
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track writes and primary pinning for ``planner.routers``.
+
+    After a request that wrote (any non-GET/HEAD request, or any request
+    whose queries wrote), the client gets a cookie pinning its reads to the
+    primary for REPLICA_STICKY_SECONDS, which should exceed the replica's
+    lag. Must come after SessionMiddleware so session saves don't count as
+    writes. Disabled unless a replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = settings.REPLICA_STICKY_SECONDS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = routers.begin_request(pinned=routers.PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(request, state, response)
+
+    async def __acall__(self, request):
+        state, token = routers.begin_request(pinned=routers.PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(request, state, response)
+
+    def pin(self, request, state, response):
+        if state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=self.sticky_seconds,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class ShardRoutingMiddleware:
+    """
+    Route a request's planner queries to the logged-in user's shard.
+
+    Must come after AuthenticationMiddleware. The user is only looked up
+    when a sharded model is first queried. Disabled unless SHARD_DATABASES
+    is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not sharding.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with sharding.for_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with sharding.for_request(request):
+            return await self.get_response(request)
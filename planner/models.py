@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+import os
+
+from .storage import ContentAddressedStorage, file_sha256
 
 
 class UserProfile(models.Model):
@@ -17,10 +20,14 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
-    def update_streak(self):
-        today = timezone.now().date()
+    def advance_streak(self, study_date=None):
+        """Count ``study_date`` (default: today) towards the streak, without saving."""
+        today = study_date or timezone.now().date()
         if self.last_study_date:
             days_diff = (today - self.last_study_date).days
+            if days_diff < 0:
+                # Late-arriving activity (e.g. an offline sync) never rewinds the streak
+                return
             if days_diff == 1:
                 self.current_streak += 1
             elif days_diff > 1:
@@ -32,6 +39,9 @@ class UserProfile(models.Model):
             self.longest_streak = self.current_streak
         
         self.last_study_date = today
+    
+    def update_streak(self, study_date=None):
+        self.advance_streak(study_date)
         self.save()
 
 
@@ -134,14 +144,17 @@ class PomodoroSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pomodoro_sessions')
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='pomodoro_sessions', null=True, blank=True)
     duration_minutes = models.IntegerField(default=25)
-    started_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(default=timezone.now)
     completed = models.BooleanField(default=False)
+    # Idempotency key supplied by offline clients when syncing queued sessions
+    client_id = models.CharField(max_length=64, null=True, blank=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.duration_minutes}min - {self.started_at.date()}"
     
     class Meta:
         ordering = ['-started_at']
+        unique_together = ['user', 'client_id']
 
 
 class GeneratedQuestion(models.Model):
@@ -158,6 +171,10 @@ class GeneratedQuestion(models.Model):
     ]
     
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='questions')
+    # Denormalized from topic.subject.user so the question bank filters without joins
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generated_questions', null=True, blank=True)
+    # Denormalized from topic.subject for the question bank's subject filter
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
     question_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES)
     question_text = models.TextField()
@@ -167,6 +184,8 @@ class GeneratedQuestion(models.Model):
     option_d = models.CharField(max_length=500, blank=True)
     correct_answer = models.CharField(max_length=500, blank=True)
     explanation = models.TextField(blank=True)
+    # MinHash signature of question_text, see planner.dedup
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -174,6 +193,46 @@ class GeneratedQuestion(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # Each index ends in the keyset used to paginate the question bank
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='question_bank_idx'),
+            models.Index(fields=['user', 'question_type', '-created_at', '-id'], name='question_bank_type_idx'),
+            models.Index(fields=['user', 'difficulty', '-created_at', '-id'], name='question_bank_diff_idx'),
+            models.Index(fields=['user', 'subject', '-created_at', '-id'], name='question_bank_subject_idx'),
+            models.Index(fields=['topic', '-created_at', '-id'], name='question_topic_idx'),
+        ]
+
+
+class QuestionBucket(models.Model):
+    """One LSH band of a question's MinHash signature, used to find near-duplicates."""
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='+')
+    question = models.ForeignKey(GeneratedQuestion, on_delete=models.CASCADE, related_name='buckets')
+    key = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'key'], name='question_bucket_idx'),
+        ]
+
+
+class QuizAttempt(models.Model):
+    """One answered question in a quiz session."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
+    question = models.ForeignKey(GeneratedQuestion, on_delete=models.CASCADE, related_name='attempts')
+    # Groups the attempts of one quiz session
+    quiz_id = models.CharField(max_length=32, db_index=True)
+    difficulty = models.CharField(max_length=10, choices=GeneratedQuestion.DIFFICULTY_CHOICES)
+    is_correct = models.BooleanField()
+    answered_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.question_id} - {'correct' if self.is_correct else 'wrong'}"
+    
+    class Meta:
+        ordering = ['-answered_at']
+        indexes = [
+            models.Index(fields=['user', '-answered_at'], name='quiz_attempt_user_idx'),
+        ]
 
 
 class Badge(models.Model):
@@ -202,15 +261,95 @@ class Badge(models.Model):
         unique_together = ['user', 'badge_type']
 
 
+def syllabus_upload_path(instance, filename):
+    """Store uploads under their content hash so identical files are kept once."""
+    if not instance.content_hash:
+        return f'syllabi/{filename}'
+    extension = os.path.splitext(filename)[1].lower()
+    return f'syllabi/{instance.content_hash[:2]}/{instance.content_hash}{extension}'
+
+
 class SyllabusUpload(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='syllabus_uploads')
-    file = models.FileField(upload_to='syllabi/')
+    file = models.FileField(upload_to=syllabus_upload_path, storage=ContentAddressedStorage())
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     text_content = models.TextField(blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, default='pending', choices=STATUS_CHOICES)
+    # When a worker last claimed the upload; see tasks.claimable_uploads
+    processing_started_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    # Page count and per-page timings recorded during document extraction
+    extraction_stats = models.JSONField(default=dict, blank=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.uploaded_at.date()}"
     
+    def save(self, *args, **kwargs):
+        # Hash a new file before it is written, so it's stored under its content hash
+        if self.file and not self.file._committed and not self.content_hash:
+            self.content_hash = file_sha256(self.file)
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['-uploaded_at']
+
+
+class ParsedSyllabus(models.Model):
+    """Topic structure parsed from a syllabus file, cached by its SHA-256; scores are recomputed on import."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    topics = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} - {len(self.topics)} topics"
+    
+    class Meta:
+        ordering = ['-created_at']
+
+
+class QuestionCache(models.Model):
+    """Pool of generated questions shared by every topic with the same normalized name."""
+    key = models.CharField(max_length=64, unique=True)
+    topic_text = models.CharField(max_length=300)
+    question_type = models.CharField(max_length=10, choices=GeneratedQuestion.TYPE_CHOICES)
+    difficulty = models.CharField(max_length=10, choices=GeneratedQuestion.DIFFICULTY_CHOICES)
+    questions = models.JSONField(default=list)
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.topic_text} - {self.question_type} - {self.difficulty}"
+    
+    class Meta:
+        ordering = ['-last_used_at']
+
+
+class RequestProfile(models.Model):
+    """A cProfile dump of one request, written by ProfilerMiddleware."""
+    # File stem under PROFILE_DIR; the dumps are <name>.prof and <name>.collapsed
+    name = models.CharField(max_length=64, unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status_code = models.IntegerField()
+    duration_ms = models.FloatField()
+    top_functions = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+    
+    class Meta:
+        ordering = ['-created_at']
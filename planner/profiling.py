@@ -0,0 +1,147 @@
+"""
+On-demand request profiling.
+
+ProfilerMiddleware (see ``planner.middleware``) runs a request under
+cProfile when a staff user asks for it, or for a random sample of requests.
+Each profile is written to PROFILE_DIR twice: as a ``.prof`` file for
+pstats/snakeviz, and as a ``.collapsed`` file of folded stacks for
+flamegraph.pl or speedscope. A RequestProfile row with the top functions
+makes recent profiles browsable in the admin. Only the newest
+PROFILE_MAX_FILES profiles are kept.
+"""
+import os
+import pstats
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RequestProfile
+
+TOP_FUNCTIONS = 15
+# Folded stacks deeper than this, or worth less than a microsecond, are dropped
+MAX_STACK_DEPTH = 64
+MIN_STACK_SECONDS = 1e-6
+
+
+def function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Built-ins, e.g. "<built-in method time.sleep>"
+        return name
+    return f'{os.path.basename(filename)}:{line}({name})'
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    """Return the functions with the most own time, as JSON-friendly dicts."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            'function': function_label(func),
+            'calls': nc,
+            'tottime': round(tt, 6),
+            'cumtime': round(ct, 6),
+        }
+        for func, (cc, nc, tt, ct, callers) in rows
+    ]
+
+
+def code_key(function):
+    """Return the pstats key of a Python function, or None for other callables."""
+    code = getattr(function, '__code__', None)
+    if code is None:
+        return None
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def collapsed_stacks(stats, entry=None):
+    """
+    Fold a cProfile call graph into ``frame;frame;frame microseconds`` lines.
+
+    cProfile keeps caller/callee edges rather than whole stacks, so each
+    function's own time is split across its callers in proportion to the
+    time spent on each edge, the same estimate gprof-style tools make.
+    Recursive cycles are cut at the first repeat. ``entry`` is the pstats
+    key of the profiled callable; without it, functions with no recorded
+    caller are used as roots.
+    """
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            if caller != func:
+                callees.setdefault(caller, []).append((func, edge[3]))
+
+    if entry in stats.stats:
+        roots = [entry]
+    else:
+        roots = [func for func, row in stats.stats.items() if not row[4]]
+
+    folded = {}
+
+    def walk(func, path, seen, seconds):
+        if seconds < MIN_STACK_SECONDS or len(path) >= MAX_STACK_DEPTH:
+            return
+        cc, nc, tt, ct, callers = stats.stats[func]
+        share = min(seconds / ct, 1.0) if ct else 0.0
+        path = path + (function_label(func).replace(';', ':'),)
+        seen = seen | {func}
+        own = tt * share
+        if own >= MIN_STACK_SECONDS:
+            key = ';'.join(path)
+            folded[key] = folded.get(key, 0.0) + own
+        for callee, edge_seconds in callees.get(func, ()):
+            if callee not in seen:
+                walk(callee, path, seen, edge_seconds * share)
+
+    for root in roots:
+        walk(root, (), frozenset(), stats.stats[root][3])
+
+    return [f'{stack} {round(seconds * 1e6)}' for stack, seconds in folded.items() if round(seconds * 1e6)]
+
+
+def save_profile(profiler, request, response, duration, entry=None):
+    """Write the dump files for a finished request and record it."""
+    directory = str(settings.PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    now = timezone.now()
+    name = f'{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+    stem = os.path.join(directory, name)
+
+    profiler.dump_stats(f'{stem}.prof')
+    stats = pstats.Stats(profiler)
+    with open(f'{stem}.collapsed', 'w') as handle:
+        handle.write('\n'.join(collapsed_stacks(stats, entry)) + '\n')
+
+    match = request.resolver_match
+    user = getattr(request, 'user', None)
+    profile = RequestProfile.objects.create(
+        name=name,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view_name=(match.view_name if match else '')[:200],
+        user=user if user is not None and user.is_authenticated else None,
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 2),
+        top_functions=top_functions(stats),
+        created_at=now
+    )
+    prune_profiles()
+    return profile
+
+
+def delete_files(name):
+    for extension in ('.prof', '.collapsed'):
+        try:
+            os.remove(os.path.join(str(settings.PROFILE_DIR), name + extension))
+        except FileNotFoundError:
+            pass
+
+
+def prune_profiles(keep=None):
+    """Delete all but the newest ``keep`` profiles (default PROFILE_MAX_FILES)."""
+    keep = settings.PROFILE_MAX_FILES if keep is None else keep
+    stale = list(RequestProfile.objects.order_by('-created_at', '-id').values_list('pk', 'name')[keep:])
+    for pk, name in stale:
+        delete_files(name)
+    RequestProfile.objects.filter(pk__in=[pk for pk, _ in stale]).delete()
+    return len(stale)
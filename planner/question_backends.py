@@ -0,0 +1,242 @@
+"""
+Pluggable backends for AI question generation.
+
+A backend turns ``(topic_name, question_type, difficulty, num_questions)``
+into a list of question dicts. ``LocalBackend`` is a deterministic
+template generator used by default and in tests; ``OpenAIBackend`` calls
+the OpenAI chat API. Requests are fanned out on asyncio with a bounded
+number in flight, so several slow LLM calls overlap instead of queueing.
+"""
+import asyncio
+import json
+import zlib
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class QuestionBackend:
+    """Interface for question generators."""
+
+    # Whether generate_many may split one request into concurrent chunks.
+    # A backend whose calls can't see each other's output should say no,
+    # or the chunks of one request repeat each other.
+    chunked = True
+
+    async def generate(self, topic_name, question_type, difficulty, num_questions, offset=0, avoid=()):
+        """
+        Return ``num_questions`` question dicts for a topic.
+
+        ``offset`` is the index of the first question when a request has been
+        split into chunks, so numbering stays unique across chunks. ``avoid``
+        holds the text of questions that already exist for the topic, which
+        new ones shouldn't repeat.
+        """
+        raise NotImplementedError
+
+
+class LocalBackend(QuestionBackend):
+    """
+    Template-based generator. Deterministic: same input, same questions.
+
+    Question ``i`` pairs one of FOCUSES with one of the STEMS for its type,
+    cycling through the foci first. Each focus brings its own sentence, so
+    questions on one topic differ by much more than a number and pass the
+    near-duplicate filter. After ``len(FOCUSES) * len(STEMS[type])``
+    questions the texts repeat exactly.
+    """
+
+    # (aspect of the topic, what the question asks the student to do about it)
+    FOCUSES = [
+        ('core definition', 'State it precisely, in your own words, without leaning on examples.'),
+        ('underlying mechanism', 'Walk through what happens step by step and why each step follows.'),
+        ('real-world applications', 'Name a concrete setting where it is used and what it achieves there.'),
+        ('common misconceptions', 'Pick one belief students often hold about it and correct it.'),
+        ('historical development', 'Describe how thinking about it changed and what prompted the change.'),
+        ('key assumptions', 'List what must hold for it to apply and what breaks when one fails.'),
+        ('main limitations', 'Identify a case it cannot handle and suggest what is used instead.'),
+        ('links to neighbouring ideas', 'Compare it with a closely related idea, noting one similarity and one difference.'),
+        ('notation and terminology', 'Explain the standard terms and symbols and how they are read.'),
+        ('supporting evidence', 'Describe an observation or experiment that backs it up.'),
+        ('typical exam pitfalls', 'Point out a mistake markers often see and how to avoid it.'),
+        ('practical consequences', 'Explain what changes in practice once it is understood.'),
+    ]
+    STEMS = {
+        'mcq': [
+            'Which statement best captures the {focus} of {topic}? {task}',
+            'A classmate is revising the {focus} of {topic}. {task} Which option is correct?',
+        ],
+        'short': [
+            'Briefly explain the {focus} of {topic}. {task}',
+            'A friend missed the lecture on {topic}. In two or three sentences, '
+            'help them with its {focus}. {task} Keep it short.',
+            'You are writing a revision card on {topic}. Summarise its {focus} '
+            'in under fifty words. {task}',
+        ],
+        'long': [
+            'Discuss the {focus} of {topic} in detail. {task}',
+            'Write an essay-length answer on the {focus} of {topic}. {task} Support each point with an example.',
+        ],
+    }
+
+    async def generate(self, topic_name, question_type, difficulty, num_questions, offset=0, avoid=()):
+        # Numbering from ``offset`` already keeps these distinct from ``avoid``
+        return [
+            self.build_question(topic_name, question_type, i)
+            for i in range(offset, offset + num_questions)
+        ]
+
+    def build_question(self, topic_name, question_type, i):
+        focus, task = self.FOCUSES[i % len(self.FOCUSES)]
+        stems = self.STEMS[question_type]
+        text = stems[(i // len(self.FOCUSES)) % len(stems)].format(focus=focus, topic=topic_name, task=task)
+
+        if question_type == 'mcq':
+            correct = 'ABCD'[zlib.crc32(text.encode('utf-8')) % 4]
+            distractors = iter([
+                f"It is unrelated to the {focus} of {topic_name}",
+                f"It only applies to edge cases of {topic_name}",
+                f"It contradicts the accepted view of {topic_name}",
+            ])
+            return {
+                'type': 'mcq',
+                'question': text,
+                'options': {
+                    letter: (f"It describes the {focus} of {topic_name} accurately"
+                             if letter == correct else next(distractors))
+                    for letter in 'ABCD'
+                },
+                'correct_answer': correct,
+                'explanation': f"This question tests the {focus} of {topic_name}."
+            }
+        elif question_type == 'short':
+            return {
+                'type': 'short',
+                'question': text,
+                'answer': f"A good answer states the {focus} of {topic_name} clearly and concisely.",
+                'explanation': f"This question checks recall of the {focus} of {topic_name}."
+            }
+        else:  # long
+            return {
+                'type': 'long',
+                'question': text,
+                'answer': f"A comprehensive answer covers the {focus} of {topic_name}, with theory, examples and evaluation.",
+                'explanation': f"This question requires in-depth knowledge of the {focus} of {topic_name}."
+            }
+
+
+class OpenAIBackend(QuestionBackend):
+    """Generates questions with the OpenAI chat completions API."""
+
+    TYPE_INSTRUCTIONS = {
+        'mcq': 'multiple choice questions with four options A-D, "options" (an object '
+               'keyed A, B, C, D) and "correct_answer" (one letter)',
+        'short': 'short answer questions with a model "answer" of one to three sentences',
+        'long': 'long answer questions with a model "answer" outlining the key points',
+    }
+
+    # One call per request: separate calls would write overlapping questions
+    chunked = False
+    # Existing questions quoted in the prompt, and how much of each
+    MAX_AVOID = 50
+    AVOID_CHARS = 150
+
+    def __init__(self):
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.model = settings.OPENAI_QUESTION_MODEL
+
+    async def generate(self, topic_name, question_type, difficulty, num_questions, offset=0, avoid=()):
+        prompt = (
+            f'Write {num_questions} {difficulty} {self.TYPE_INSTRUCTIONS[question_type]} '
+            f'about "{topic_name}" for a student preparing for an exam. Every question '
+            f'also needs an "explanation". Reply with JSON: {{"questions": [...]}} where '
+            f'each item has "question" plus the fields above.'
+        )
+        avoid = list(avoid)[-self.MAX_AVOID:]
+        if offset or avoid:
+            prompt += (
+                f'\n\nThese are questions {offset + 1} to {offset + num_questions} of a '
+                f'larger set. Each must test something different from every other question '
+                f'in the set'
+            )
+            if avoid:
+                prompt += ', including these existing ones:\n' + '\n'.join(
+                    f'- {text[:self.AVOID_CHARS]}' for text in avoid
+                )
+            else:
+                prompt += '.'
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{'role': 'user', 'content': prompt}],
+            response_format={'type': 'json_object'},
+        )
+        items = json.loads(response.choices[0].message.content).get('questions', [])
+
+        questions = []
+        for item in items[:num_questions]:
+            question = {
+                'type': question_type,
+                'question': str(item.get('question', '')).strip(),
+                'explanation': str(item.get('explanation', '')),
+            }
+            if not question['question']:
+                continue
+            if question_type == 'mcq':
+                options = item.get('options') or {}
+                question['options'] = {key: str(options.get(key, '')) for key in 'ABCD'}
+                question['correct_answer'] = str(item.get('correct_answer', '')).strip()[:1].upper()
+            else:
+                question['answer'] = str(item.get('answer', ''))
+            questions.append(question)
+        return questions
+
+
+def get_backend():
+    """Instantiate the backend named by ``settings.QUESTION_BACKEND``."""
+    return import_string(settings.QUESTION_BACKEND)()
+
+
+async def generate_many(requests, backend=None, concurrency=None, chunk_size=None):
+    """
+    Run many generation requests concurrently.
+
+    ``requests`` is a list of ``(topic_name, question_type, difficulty,
+    num_questions)`` tuples, optionally followed by the index of the first
+    question and the texts of existing questions to avoid. Each request is
+    split into chunks of at most ``chunk_size`` questions (unless the backend
+    isn't ``chunked``) and at most ``concurrency`` calls are in flight at once.
+    Returns one list of questions per request, in request order.
+    """
+    backend = backend or get_backend()
+    concurrency = concurrency or settings.QUESTION_CONCURRENCY
+    chunk_size = chunk_size or settings.QUESTION_CHUNK_SIZE
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(topic_name, question_type, difficulty, count, offset, avoid):
+        async with semaphore:
+            return await backend.generate(topic_name, question_type, difficulty, count, offset, avoid)
+
+    chunks = []
+    for index, request in enumerate(requests):
+        topic_name, question_type, difficulty, num_questions, *extra = request
+        start = extra[0] if extra else 0
+        avoid = extra[1] if len(extra) > 1 else ()
+        size = chunk_size if backend.chunked else max(num_questions, 1)
+        for offset in range(start, start + num_questions, size):
+            count = min(size, start + num_questions - offset)
+            chunks.append((index, run(topic_name, question_type, difficulty, count, offset, avoid)))
+
+    results = await asyncio.gather(*(coroutine for _, coroutine in chunks))
+
+    questions = [[] for _ in requests]
+    for (index, _), generated in zip(chunks, results):
+        questions[index].extend(generated)
+    return questions
+
+
+def generate_question_batches(requests, **kwargs):
+    """Synchronous wrapper around ``generate_many`` for use in views."""
+    return async_to_sync(generate_many)(requests, **kwargs)
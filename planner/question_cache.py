@@ -0,0 +1,119 @@
+"""
+Persistent cache of generated questions.
+
+Students across the platform study the same topics, so generated
+questions are pooled per (normalized topic name, question type,
+difficulty) in the QuestionCache table. A request is served from the pool
+when it holds enough questions the requester doesn't already have, as a
+random subset. Otherwise only the shortfall is generated and added to the
+pool.
+The table is bounded to QUESTION_CACHE_MAX_ENTRIES rows by evicting the
+least recently used entries.
+"""
+import hashlib
+import random
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .ai_utils import generate_questions, normalize_topic_text
+from .models import QuestionCache
+
+
+def cache_key(topic_name, question_type, difficulty):
+    """Return the cache key for a normalized topic and generation parameters."""
+    raw = '\x1f'.join([normalize_topic_text(topic_name), question_type, difficulty])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_questions(topic_name, question_type, difficulty, num_questions=5, exclude=()):
+    """
+    Return ``num_questions`` questions for a topic, generating only what
+    the shared pool can't supply.
+
+    ``exclude`` holds the texts of questions the requester already has.
+    Pooled questions among them are skipped, and whatever is still missing is
+    generated and added to the pool, so repeat requests keep producing new
+    questions instead of the same pooled ones. Fewer than ``num_questions``
+    (possibly none) come back once the backend can't produce new ones.
+    """
+    key = cache_key(topic_name, question_type, difficulty)
+    now = timezone.now()
+    exclude = set(exclude)
+    entry = QuestionCache.objects.filter(key=key).first()
+    pool = entry.questions if entry else []
+    available = [q for q in pool if q['question'] not in exclude]
+
+    if len(available) >= num_questions:
+        QuestionCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+        return random.sample(available, num_questions)
+
+    # Number past every question known for the topic, pooled or already in the
+    # requester's bank, so a full pool doesn't keep producing the same extras
+    known = list(dict.fromkeys([q['question'] for q in pool] + sorted(exclude)))
+    generated = generate_questions(
+        topic_name, question_type, difficulty,
+        num_questions - len(available), offset=len(known), avoid=known
+    )
+    # A backend that has run out of new questions repeats old ones; those add nothing
+    seen = set(known)
+    novel = []
+    for question in generated:
+        if question['question'] not in seen:
+            seen.add(question['question'])
+            novel.append(question)
+    generated = novel
+
+    if entry:
+        # Another request may have grown the pool meanwhile; add to what is there now
+        entry.refresh_from_db(fields=['questions'])
+        pooled = {q['question'] for q in entry.questions}
+        questions = entry.questions + [q for q in generated if q['question'] not in pooled]
+        QuestionCache.objects.filter(pk=entry.pk).update(
+            questions=questions[:settings.QUESTION_CACHE_POOL_SIZE],
+            misses=F('misses') + 1,
+            last_used_at=now
+        )
+    else:
+        _, created = QuestionCache.objects.get_or_create(
+            key=key,
+            defaults={
+                'topic_text': normalize_topic_text(topic_name)[:300],
+                'question_type': question_type,
+                'difficulty': difficulty,
+                'questions': generated[:settings.QUESTION_CACHE_POOL_SIZE],
+                'misses': 1,
+                'last_used_at': now,
+            }
+        )
+        if created:
+            evict()
+
+    return available + generated
+
+
+def evict():
+    """Delete least recently used entries beyond QUESTION_CACHE_MAX_ENTRIES."""
+    excess = QuestionCache.objects.count() - settings.QUESTION_CACHE_MAX_ENTRIES
+    if excess > 0:
+        stale = QuestionCache.objects.order_by('last_used_at').values_list('pk', flat=True)[:excess]
+        QuestionCache.objects.filter(pk__in=list(stale)).delete()
+
+
+def cache_stats():
+    """Return entry count, hits, misses and hit rate across the whole cache."""
+    totals = QuestionCache.objects.aggregate(
+        entries=Count('pk'),
+        hits=Sum('hits'),
+        misses=Sum('misses'),
+    )
+    hits = totals['hits'] or 0
+    misses = totals['misses'] or 0
+    lookups = hits + misses
+    return {
+        'entries': totals['entries'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,158 @@
+"""
+Adaptive quiz sessions over a user's question bank.
+
+Starting a quiz reads the candidate question ids once and buckets them by
+difficulty and type. The buckets live in the user's session, so picking the
+next question is a constant-time swap-and-pop from a bucket instead of an
+``ORDER BY RANDOM()`` query. The difficulty level moves up after a run of
+correct answers and down after a miss. Attempts are buffered in the session
+and written with one bulk insert when the quiz ends.
+"""
+import random
+import uuid
+
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import GeneratedQuestion, QuizAttempt, UserProfile
+
+LEVELS = ['easy', 'medium', 'hard']
+START_LEVEL = 1
+# Consecutive correct answers needed to move up a level
+STEP_UP_STREAK = 2
+MAX_QUIZ_LENGTH = 50
+XP_PER_CORRECT = 5
+
+SESSION_KEY = 'quiz'
+
+
+def build_quiz(user, length, topic=None, question_type=None):
+    """
+    Return a new quiz state for ``user``, or None if no questions match.
+
+    Each (difficulty, type) bucket keeps at most ``length`` randomly chosen
+    ids, which is all a quiz of that length can ever draw from it, so the
+    session stays small however large the bank is.
+    """
+    questions = GeneratedQuestion.objects.filter(user=user)
+    if topic is not None:
+        questions = questions.filter(topic=topic)
+    if question_type:
+        questions = questions.filter(question_type=question_type)
+
+    buckets = {}
+    for pk, difficulty, kind in questions.order_by().values_list('pk', 'difficulty', 'question_type'):
+        buckets.setdefault(f'{difficulty}:{kind}', []).append(pk)
+    if not buckets:
+        return None
+
+    for key, ids in buckets.items():
+        if len(ids) > length:
+            buckets[key] = random.sample(ids, length)
+
+    return {
+        'id': uuid.uuid4().hex,
+        'length': length,
+        'level': START_LEVEL,
+        'streak': 0,
+        'buckets': buckets,
+        'current': None,
+        'last': None,
+        'attempts': [],
+    }
+
+
+def _level_order(level):
+    """Levels to try, nearest to ``level`` first, preferring easier on ties."""
+    return sorted(range(len(LEVELS)), key=lambda other: (abs(other - level), other))
+
+
+def next_question_id(state):
+    """
+    Draw the next question id without replacement, or None when exhausted.
+
+    Picks the nearest level that still has questions, a type bucket within
+    it weighted by size, then a uniformly random id from that bucket.
+    """
+    buckets = state['buckets']
+    for level in _level_order(state['level']):
+        prefix = LEVELS[level] + ':'
+        candidates = [ids for key, ids in buckets.items() if key.startswith(prefix) and ids]
+        if not candidates:
+            continue
+
+        pick = random.randrange(sum(len(ids) for ids in candidates))
+        for ids in candidates:
+            if pick < len(ids):
+                break
+            pick -= len(ids)
+        # Swap the chosen id to the end so removing it is O(1)
+        ids[pick], ids[-1] = ids[-1], ids[pick]
+        return ids.pop()
+    return None
+
+
+def record_answer(state, question, correct):
+    """Buffer an attempt and adapt the difficulty level to the answer."""
+    state['attempts'].append([question.pk, question.difficulty, correct, timezone.now().isoformat()])
+    if correct:
+        state['streak'] += 1
+        if state['streak'] >= STEP_UP_STREAK:
+            state['level'] = min(state['level'] + 1, len(LEVELS) - 1)
+            state['streak'] = 0
+    else:
+        state['level'] = max(state['level'] - 1, 0)
+        state['streak'] = 0
+
+
+def is_finished(state):
+    return len(state['attempts']) >= state['length'] or (
+        state['current'] is None and not any(state['buckets'].values())
+    )
+
+
+def finish_quiz(user, state):
+    """Write the buffered attempts in one batch, award XP and return a summary."""
+    attempts = [
+        QuizAttempt(
+            user=user,
+            question_id=pk,
+            quiz_id=state['id'],
+            difficulty=difficulty,
+            is_correct=correct,
+            answered_at=parse_datetime(answered_at)
+        )
+        for pk, difficulty, correct, answered_at in state['attempts']
+    ]
+    correct = sum(attempt.is_correct for attempt in attempts)
+    xp = correct * XP_PER_CORRECT
+
+    with transaction.atomic(using=router.db_for_write(QuizAttempt, instance=user)):
+        # Questions deleted mid-quiz would violate the foreign key
+        existing = set(GeneratedQuestion.objects.filter(
+            pk__in=[attempt.question_id for attempt in attempts]
+        ).values_list('pk', flat=True))
+        QuizAttempt.objects.bulk_create([a for a in attempts if a.question_id in existing])
+        if xp:
+            UserProfile.objects.filter(user=user).update(total_xp=F('total_xp') + xp)
+
+    by_level = []
+    for level in LEVELS:
+        answered = [a for a in attempts if a.difficulty == level]
+        if answered:
+            by_level.append({
+                'difficulty': level,
+                'answered': len(answered),
+                'correct': sum(a.is_correct for a in answered),
+            })
+
+    return {
+        'answered': len(attempts),
+        'correct': correct,
+        'percentage': round(correct / len(attempts) * 100) if attempts else 0,
+        'xp': xp,
+        'final_level': LEVELS[state['level']],
+        'by_level': by_level,
+    }
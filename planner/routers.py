@@ -0,0 +1,122 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to the REPLICA_DATABASE alias
+only inside views decorated with ``@replica_reads``, which are the pages
+that just aggregate existing data (analytics, badges, leaderboard, question
+bank, calendar). Everything else reads from the primary.
+
+A replica lags behind the primary, so ReplicaRoutingMiddleware (see
+``planner.middleware``) pins a client to the primary for
+REPLICA_STICKY_SECONDS after any request that wrote, and reads in a request
+go back to the primary after the request's first write or while a
+transaction is open on the primary. A user never sees a page without the
+change they just made.
+
+Without a REPLICA_DATABASE entry in DATABASES the router does nothing and
+every query uses ``default``.
+"""
+import functools
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set while the client is pinned to the primary
+PIN_COOKIE = 'db_primary_pin'
+
+
+class RoutingState:
+    """Per-request routing flags, set up by ReplicaRoutingMiddleware."""
+
+    __slots__ = ('pinned', 'use_replica', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+
+
+_state = ContextVar('planner_db_routing', default=None)
+
+
+def replica_configured():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+def begin_request(pinned):
+    """Start routing for a request; returns the state and a token for ``end_request``."""
+    state = RoutingState(pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def replica_reads(view):
+    """Let a read-only view's queries use the replica."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            state = _state.get()
+            if state is None or state.pinned:
+                return await view(request, *args, **kwargs)
+            state.use_replica = True
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                state.use_replica = False
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None or state.pinned:
+            return view(request, *args, **kwargs)
+        state.use_replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.use_replica = False
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Send writes to ``default`` and reads in ``@replica_reads`` views to the replica."""
+
+    def __init__(self):
+        self.replica = settings.REPLICA_DATABASE
+        self.enabled = replica_configured()
+
+    def db_for_read(self, model, **hints):
+        if not self.enabled:
+            return None
+        state = _state.get()
+        if (
+            state is not None and state.use_replica and not state.wrote
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return self.replica
+        # Explicit, so objects loaded from the replica don't drag related lookups there
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not self.enabled:
+            return None
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self.enabled and {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, self.replica}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        if db == self.replica:
+            return False
+        return None
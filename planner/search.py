@@ -0,0 +1,238 @@
+"""
+Full-text search over topics, generated questions and task notes.
+
+Documents live in a ``planner_search`` table outside the ORM: an FTS5
+virtual table on SQLite, or a table with a GIN-indexed tsvector column on
+PostgreSQL. Each document's id packs the object's primary key and its kind
+(``pk * 4 + kind``), so updates and deletes are single-row operations.
+Results are always restricted to one user and ranked by relevance. Each
+database keeps the index of the rows it holds, so with sharding every
+shard has its own.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router, transaction
+from django.urls import reverse
+
+TABLE = 'planner_search'
+
+KIND_TOPIC = 0
+KIND_QUESTION = 1
+KIND_TASK = 2
+KIND_NAMES = {KIND_TOPIC: 'topic', KIND_QUESTION: 'question', KIND_TASK: 'task'}
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Rows written per executemany() call when rebuilding
+REBUILD_BATCH_SIZE = 5000
+
+
+def document_id(kind, pk):
+    return pk * 4 + kind
+
+
+class SQLiteBackend:
+    """FTS5 index; the owner is an indexed token so filtering uses the index."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            f"owner, title, body, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def insert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, owner, title, body) VALUES (%s, %s, %s, %s)',
+            [(doc_id, f'u{owner}', title, body) for doc_id, owner, title, body in rows]
+        )
+
+    def upsert(self, cursor, rows):
+        # FTS5 tables have no ON CONFLICT clause
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        self.insert(cursor, rows)
+
+    def delete(self, cursor, doc_id):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [doc_id])
+
+    def search(self, cursor, user_id, terms, limit):
+        # Quote every term so user input can't inject FTS5 query syntax
+        match = f'owner : "u{user_id}" AND ' + ' AND '.join(f'"{term}"*' for term in terms)
+        cursor.execute(
+            f"SELECT rowid, title, snippet({TABLE}, 2, '', '', '…', 12) "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY bm25({TABLE}, 0, 10.0, 1.0) LIMIT %s",
+            [match, limit]
+        )
+        return cursor.fetchall()
+
+
+class PostgresBackend:
+    """Regular table with a generated, weighted tsvector column and a GIN index."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            f"id bigint PRIMARY KEY, owner bigint NOT NULL, title text, body text, "
+            f"document tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED)"
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document ON {TABLE} USING GIN (document)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_owner ON {TABLE} (owner)')
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def insert(self, cursor, rows):
+        cursor.executemany(f'INSERT INTO {TABLE} (id, owner, title, body) VALUES (%s, %s, %s, %s)', rows)
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (id, owner, title, body) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT (id) DO UPDATE SET owner = EXCLUDED.owner, '
+            f'title = EXCLUDED.title, body = EXCLUDED.body',
+            rows
+        )
+
+    def delete(self, cursor, doc_id):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE id = %s', [doc_id])
+
+    def search(self, cursor, user_id, terms, limit):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        cursor.execute(
+            f"SELECT id, title, ts_headline('english', coalesce(body, ''), q, "
+            f"'StartSel=\"\", StopSel=\"\", MaxWords=24, MinWords=8') "
+            f"FROM {TABLE}, to_tsquery('english', %s) q "
+            f"WHERE owner = %s AND document @@ q ORDER BY ts_rank(document, q) DESC LIMIT %s",
+            [query, user_id, limit]
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgresBackend(),
+}
+
+
+def get_backend(conn=None):
+    """Return the search backend for a connection, or None if unsupported."""
+    return BACKENDS.get((conn or connection).vendor)
+
+
+def ensure_index(conn=None):
+    """Create the search table if the database supports it."""
+    conn = conn or connection
+    backend = get_backend(conn)
+    if backend:
+        with conn.cursor() as cursor:
+            backend.create(cursor)
+
+
+def topic_document(topic):
+    return (document_id(KIND_TOPIC, topic.pk), topic.subject.user_id, topic.name, topic.chapter)
+
+
+def question_document(question):
+    owner = question.user_id or question.topic.subject.user_id
+    return (document_id(KIND_QUESTION, question.pk), owner, question.question_text, question.explanation)
+
+
+def task_document(task):
+    return (document_id(KIND_TASK, task.pk), task.user_id, task.topic.name, task.notes)
+
+
+def index_documents(rows, using=DEFAULT_DB_ALIAS):
+    """Insert or replace ``(doc_id, owner, title, body)`` rows in database ``using``."""
+    conn = connections[using]
+    backend = get_backend(conn)
+    if backend and rows:
+        with conn.cursor() as cursor:
+            backend.upsert(cursor, rows)
+
+
+def remove_document(kind, pk, using=DEFAULT_DB_ALIAS):
+    conn = connections[using]
+    backend = get_backend(conn)
+    if backend:
+        with conn.cursor() as cursor:
+            backend.delete(cursor, document_id(kind, pk))
+
+
+def rebuild_index(stdout=None, using=DEFAULT_DB_ALIAS):
+    """
+    Drop and repopulate the index of database ``using`` from its rows.
+    Queries must already be routed there. Returns the row count.
+    """
+    from django.db.models import F
+    from django.db.models.functions import Coalesce
+
+    from .models import GeneratedQuestion, StudyTask, Topic
+
+    conn = connections[using]
+    backend = get_backend(conn)
+    if backend is None:
+        return 0
+
+    sources = [
+        (KIND_TOPIC, Topic.objects.values_list('pk', 'subject__user_id', 'name', 'chapter')),
+        (KIND_QUESTION, GeneratedQuestion.objects.values_list(
+            'pk', Coalesce(F('user_id'), F('topic__subject__user_id')), 'question_text', 'explanation'
+        )),
+        (KIND_TASK, StudyTask.objects.exclude(notes='').values_list('pk', 'user_id', 'topic__name', 'notes')),
+    ]
+
+    total = 0
+    with transaction.atomic(using=using), conn.cursor() as cursor:
+        backend.drop(cursor)
+        backend.create(cursor)
+        for kind, queryset in sources:
+            batch = []
+            for pk, owner, title, body in queryset.order_by().iterator(chunk_size=REBUILD_BATCH_SIZE):
+                batch.append((document_id(kind, pk), owner, title, body))
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    backend.insert(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                backend.insert(cursor, batch)
+            total += len(batch)
+            if stdout:
+                stdout.write(f'Indexed {KIND_NAMES[kind]}s ({total:,} documents so far)')
+    return total
+
+
+def result_url(kind, pk):
+    if kind == KIND_TOPIC:
+        return reverse('planner:topic_edit', args=[pk])
+    if kind == KIND_QUESTION:
+        return reverse('planner:question_detail', args=[pk])
+    return reverse('planner:task_update', args=[pk])
+
+
+def search(user, query, limit=20):
+    """Return up to ``limit`` ranked results for ``query`` among ``user``'s documents."""
+    from .models import Topic
+
+    terms = TOKEN_PATTERN.findall(query.lower())[:8]
+    conn = connections[router.db_for_read(Topic, instance=user)]
+    backend = get_backend(conn)
+    if not terms or backend is None:
+        return []
+
+    with conn.cursor() as cursor:
+        rows = backend.search(cursor, user.pk, terms, limit)
+
+    results = []
+    for doc_id, title, snippet in rows:
+        kind, pk = doc_id % 4, doc_id // 4
+        results.append({
+            'type': KIND_NAMES[kind],
+            'id': pk,
+            'title': title,
+            'snippet': snippet,
+            'url': result_url(kind, pk),
+        })
+    return results
@@ -0,0 +1,92 @@
+"""
+Serializers for the JSON API (see ``planner.api``).
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import GeneratedQuestion, PomodoroSession, RevisionTask, StudyTask, Subject, Topic
+
+
+def requested_fields(request):
+    """Return the field names listed in ``?fields=``, or None to keep every field."""
+    # Writes always validate and echo the full representation
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get('fields', '')
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    return names or None
+
+
+class SparseFieldsMixin:
+    """Drop the fields not named in ``?fields=`` (``id`` is always kept)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested - {'id'}:
+                self.fields.pop(name)
+
+
+class SubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Subject
+        fields = ['id', 'name', 'color', 'created_at']
+
+
+class TopicSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    subject = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.none())
+    subject_name = serializers.CharField(source='subject.name', read_only=True)
+
+    class Meta:
+        model = Topic
+        fields = [
+            'id', 'subject', 'subject_name', 'chapter', 'name', 'difficulty_score',
+            'estimated_hours', 'is_completed', 'completed_at', 'created_at'
+        ]
+        read_only_fields = ['is_completed', 'completed_at', 'created_at']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if 'subject' in self.fields and request is not None:
+            # Topics can only be filed under the user's own subjects
+            self.fields['subject'].queryset = Subject.objects.filter(user=request.user)
+
+
+class StudyTaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    topic_name = serializers.CharField(source='topic.name', read_only=True)
+    subject_name = serializers.CharField(source='topic.subject.name', read_only=True)
+
+    class Meta:
+        model = StudyTask
+        fields = ['id', 'topic', 'topic_name', 'subject_name', 'scheduled_date', 'status', 'completed_at', 'notes']
+        read_only_fields = fields
+
+
+class RevisionTaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    topic_name = serializers.CharField(source='topic.name', read_only=True)
+
+    class Meta:
+        model = RevisionTask
+        fields = ['id', 'topic', 'topic_name', 'revision_type', 'scheduled_date', 'is_completed', 'completed_at']
+        read_only_fields = fields
+
+
+class PomodoroSessionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PomodoroSession
+        fields = ['id', 'topic', 'duration_minutes', 'started_at', 'completed']
+        read_only_fields = fields
+
+
+class GeneratedQuestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    topic_name = serializers.CharField(source='topic.name', read_only=True)
+
+    class Meta:
+        model = GeneratedQuestion
+        fields = [
+            'id', 'topic', 'topic_name', 'question_type', 'difficulty', 'question_text',
+            'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer', 'explanation', 'created_at'
+        ]
+        read_only_fields = fields
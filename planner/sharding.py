@@ -0,0 +1,329 @@
+"""
+User-sharded deployments.
+
+Every planner model belongs to exactly one user, so with SHARD_DATABASES
+set, each user's rows live in a single shard database picked by consistent
+hashing on the user id. Users, sessions, the admin log and the shared
+caches stay in ``default``; each shard also holds a copy of the ``auth_user``
+rows of its users so foreign keys and ``select_related('user')`` work.
+
+ShardRouter sends a query to the shard of, in order: the instance it
+concerns, the user that instance belongs to, or the current shard context.
+ShardRoutingMiddleware makes the logged-in user the context for a request,
+so views need no changes. Code that runs outside a request wraps its work in
+``for_user()``, loops over ``each_database()``, or uses ``scatter()`` to
+run a query on every shard concurrently and gather the results.
+
+Adding a shard moves only the users whose ring position now falls on it;
+``manage.py rebalance_shards`` copies them over.
+"""
+import hashlib
+import threading
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Points per shard on the hash ring; more points even out shard sizes
+RING_POINTS = 128
+
+# Sharded models, parents before children, with the lookup that leads to their user
+USER_LOOKUPS = {
+    'userprofile': 'user',
+    'subject': 'user',
+    'syllabusupload': 'user',
+    'topic': 'subject__user',
+    'studytask': 'user',
+    'revisiontask': 'user',
+    'pomodorosession': 'user',
+    'generatedquestion': 'topic__subject__user',
+    'questionbucket': 'topic__subject__user',
+    'quizattempt': 'user',
+    'badge': 'user',
+}
+
+
+class NoShardSelected(Exception):
+    """A sharded model was queried with no way to tell which shard it lives in."""
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing of keys onto named nodes."""
+
+    def __init__(self, nodes, points=RING_POINTS):
+        ring = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(points))
+        self.hashes = [h for h, _ in ring]
+        self.nodes = [node for _, node in ring]
+
+    def node_for(self, key):
+        index = bisect(self.hashes, _hash(str(key))) % len(self.hashes)
+        return self.nodes[index]
+
+
+_ring = None
+_ring_lock = threading.Lock()
+
+
+def enabled():
+    return bool(settings.SHARD_DATABASES)
+
+
+def shard_aliases():
+    return list(settings.SHARD_DATABASES)
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'planner' and model._meta.model_name in USER_LOOKUPS
+
+
+def sharded_models():
+    from django.apps import apps
+
+    return [apps.get_model('planner', name) for name in USER_LOOKUPS]
+
+
+def shard_for_user(user_id):
+    """Return the database alias holding ``user_id``'s data."""
+    global _ring
+    if _ring is None:
+        with _ring_lock:
+            if _ring is None:
+                _ring = HashRing(shard_aliases())
+    return _ring.node_for(user_id)
+
+
+def database_for_user(user_id):
+    """Like ``shard_for_user``, but ``default`` when sharding is off."""
+    return shard_for_user(user_id) if enabled() else DEFAULT_DB_ALIAS
+
+
+# Either a database alias or a request whose user decides the shard
+_current = ContextVar('planner_shard', default=None)
+
+
+def current_shard():
+    value = _current.get()
+    if value is None or isinstance(value, str):
+        return value
+    user = getattr(value, 'user', None)
+    if user is not None and user.is_authenticated:
+        return shard_for_user(user.pk)
+    return None
+
+
+@contextmanager
+def _shard_context(value):
+    token = _current.set(value)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def for_request(request):
+    """Route queries to the shard of ``request.user``, resolved on first use."""
+    return _shard_context(request)
+
+
+def for_user(user):
+    """Route queries to the shard of ``user`` (a User or a user id)."""
+    user_id = getattr(user, 'pk', user)
+    return _shard_context(shard_for_user(user_id) if enabled() else None)
+
+
+def use_shard(alias):
+    """Route queries to the shard ``alias``."""
+    return _shard_context(alias)
+
+
+def each_database():
+    """Yield every database holding planner data, with queries routed to it meanwhile."""
+    if not enabled():
+        yield DEFAULT_DB_ALIAS
+        return
+    for alias in shard_aliases():
+        with use_shard(alias):
+            yield alias
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(len(settings.SHARD_DATABASES), 1),
+                thread_name_prefix='shard'
+            )
+        return _executor
+
+
+def _run_on(alias, func):
+    try:
+        with use_shard(alias):
+            return func()
+    finally:
+        # Pool threads outlive the request; don't leave connections behind
+        connections[alias].close()
+
+
+def scatter(func):
+    """
+    Call ``func()`` once per shard, concurrently, and return the results in
+    shard order. Queries inside ``func`` are routed to that call's shard.
+    Without sharding, ``func`` is called once in the current thread.
+    """
+    if not enabled():
+        return [func()]
+    futures = [_get_executor().submit(_run_on, alias, func) for alias in shard_aliases()]
+    return [future.result() for future in futures]
+
+
+def copy_user(user, alias=None):
+    """Insert or refresh the copy of ``user``'s auth_user row on its shard."""
+    from django.contrib.auth.models import User
+
+    copy = User(**{field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields})
+    copy.save(using=alias or shard_for_user(user.pk))
+
+
+def users_in(alias):
+    """Return the ids of users with a shard copy or any planner rows in ``alias``."""
+    from django.contrib.auth.models import User
+
+    user_ids = set()
+    if alias in settings.SHARD_DATABASES:
+        user_ids.update(User.objects.using(alias).values_list('pk', flat=True))
+    for model in sharded_models():
+        user_ids.update(
+            model._base_manager.using(alias).order_by().values_list(
+                USER_LOOKUPS[model._meta.model_name], flat=True
+            ).distinct()
+        )
+    user_ids.discard(None)
+    return user_ids
+
+
+def move_user(user_id, source, target):
+    """
+    Copy a user's planner rows from ``source`` to ``target``, then delete them
+    from ``source``. Rows get new primary keys on the target, with foreign
+    keys between them remapped. Anything an interrupted earlier move left on
+    the target is cleared first, so a move can simply be retried. Returns
+    the number of rows moved.
+    """
+    from django.contrib.auth.models import User
+
+    from . import search
+
+    models = sharded_models()
+    user = User.objects.using(DEFAULT_DB_ALIAS).get(pk=user_id)
+    new_pks = {}
+    documents = []
+    moved = 0
+
+    with transaction.atomic(using=target):
+        User.objects.using(target).filter(pk=user_id).delete()
+        copy_user(user, target)
+        for model in models:
+            lookup = USER_LOOKUPS[model._meta.model_name]
+            rows = []
+            old_pks = []
+            for row in model._base_manager.using(source).filter(**{lookup: user_id}).order_by('pk'):
+                keep = True
+                for field in model._meta.concrete_fields:
+                    if field.is_relation and field.related_model in new_pks:
+                        value = getattr(row, field.attname)
+                        if value is not None:
+                            value = new_pks[field.related_model].get(value)
+                            keep = keep and (value is not None or field.null)
+                            setattr(row, field.attname, value)
+                if keep:
+                    old_pks.append(row.pk)
+                    row.pk = None
+                    row._state.adding = True
+                    rows.append(row)
+            created = model._base_manager.using(target).bulk_create(rows)
+            new_pks[model] = {old: row.pk for old, row in zip(old_pks, created)}
+            moved += len(created)
+
+            # bulk_create sends no post_save, so index the searchable rows here
+            if model._meta.model_name == 'topic':
+                topic_names = {row.pk: row.name for row in created}
+                documents += [
+                    (search.document_id(search.KIND_TOPIC, row.pk), user_id, row.name, row.chapter)
+                    for row in created
+                ]
+            elif model._meta.model_name == 'generatedquestion':
+                documents += [
+                    (search.document_id(search.KIND_QUESTION, row.pk), user_id, row.question_text, row.explanation)
+                    for row in created
+                ]
+            elif model._meta.model_name == 'studytask':
+                documents += [
+                    (search.document_id(search.KIND_TASK, row.pk), user_id, topic_names[row.topic_id], row.notes)
+                    for row in created if row.notes
+                ]
+        search.index_documents(documents, target)
+
+    with transaction.atomic(using=source):
+        # Children first; deletes send post_delete, which drops the old search documents
+        for model in reversed(models):
+            model._base_manager.using(source).filter(**{USER_LOOKUPS[model._meta.model_name]: user_id}).delete()
+        if source != DEFAULT_DB_ALIAS:
+            User.objects.using(source).filter(pk=user_id).delete()
+    return moved
+
+
+class ShardRouter:
+    """Send each sharded model's queries to the shard of the user it belongs to."""
+
+    def __init__(self):
+        self.shards = set(settings.SHARD_DATABASES)
+
+    def _shard(self, model, hints):
+        if not self.shards or not is_sharded(model):
+            return None
+
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._state.db in self.shards:
+                return instance._state.db
+            if instance._meta.label == settings.AUTH_USER_MODEL and instance.pk is not None:
+                return shard_for_user(instance.pk)
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return shard_for_user(user_id)
+
+        alias = current_shard()
+        if alias is None:
+            raise NoShardSelected(
+                f'Cannot tell which shard to use for {model._meta.label}; '
+                f'run the query inside sharding.for_user() or each_database().'
+            )
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not self.shards:
+            return None
+        dbs = {obj1._state.db, obj2._state.db}
+        if dbs & self.shards:
+            # Users live in default and on their shard; planner rows never span shards
+            return len(dbs & self.shards) == 1
+        return None
@@ -0,0 +1,90 @@
+"""
+Signal handlers that keep derived data in sync with the planner models.
+"""
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import live, search, sharding
+from .models import GeneratedQuestion, PomodoroSession, RevisionTask, StudyTask, Topic, UserProfile
+
+
+@receiver(post_migrate, dispatch_uid='planner_create_search_index')
+def create_search_index(sender, using, **kwargs):
+    from django.db import connections
+
+    if sender.name == 'planner':
+        search.ensure_index(connections[using])
+
+
+@receiver(post_save, sender=Topic, dispatch_uid='planner_index_topic')
+def index_topic(sender, instance, created, using, update_fields, **kwargs):
+    documents = [search.topic_document(instance)]
+    if not created and (update_fields is None or 'name' in update_fields):
+        # Task documents are titled with their topic's name
+        tasks = StudyTask.objects.using(using).filter(topic=instance).exclude(notes='').only('user_id', 'notes')
+        for task in tasks:
+            task.topic = instance
+            documents.append(search.task_document(task))
+    search.index_documents(documents, using)
+
+
+@receiver(post_save, sender=Topic, dispatch_uid='planner_question_subject')
+def sync_question_subject(sender, instance, created, using, **kwargs):
+    # A topic moved to another subject takes its questions' denormalized subject along
+    if not created:
+        GeneratedQuestion.objects.using(using).filter(topic=instance).exclude(
+            subject_id=instance.subject_id
+        ).update(subject_id=instance.subject_id)
+
+
+@receiver(post_save, sender=GeneratedQuestion, dispatch_uid='planner_index_question')
+def index_question(sender, instance, using, **kwargs):
+    search.index_documents([search.question_document(instance)], using)
+
+
+@receiver(post_save, sender=StudyTask, dispatch_uid='planner_index_task')
+def index_task(sender, instance, using, **kwargs):
+    # Only tasks with notes are searchable
+    if instance.notes:
+        search.index_documents([search.task_document(instance)], using)
+    else:
+        search.remove_document(search.KIND_TASK, instance.pk, using)
+
+
+@receiver(post_delete, sender=Topic, dispatch_uid='planner_unindex_topic')
+def unindex_topic(sender, instance, using, **kwargs):
+    search.remove_document(search.KIND_TOPIC, instance.pk, using)
+
+
+@receiver(post_delete, sender=GeneratedQuestion, dispatch_uid='planner_unindex_question')
+def unindex_question(sender, instance, using, **kwargs):
+    search.remove_document(search.KIND_QUESTION, instance.pk, using)
+
+
+@receiver(post_delete, sender=StudyTask, dispatch_uid='planner_unindex_task')
+def unindex_task(sender, instance, using, **kwargs):
+    search.remove_document(search.KIND_TASK, instance.pk, using)
+
+
+@receiver(post_save, sender=User, dispatch_uid='planner_copy_user_to_shard')
+def copy_user_to_shard(sender, instance, using, raw, **kwargs):
+    # Shards keep a copy of their users for foreign keys and joins
+    if sharding.enabled() and using == DEFAULT_DB_ALIAS and not raw:
+        sharding.copy_user(instance)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='planner_delete_user_from_shard')
+def delete_user_from_shard(sender, instance, using, **kwargs):
+    # Deleting the shard copy cascades to the user's planner data
+    if sharding.enabled() and using == DEFAULT_DB_ALIAS:
+        User.objects.using(sharding.shard_for_user(instance.pk)).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=UserProfile, dispatch_uid='planner_live_profile')
+@receiver(post_save, sender=StudyTask, dispatch_uid='planner_live_task')
+@receiver(post_save, sender=RevisionTask, dispatch_uid='planner_live_revision')
+@receiver(post_save, sender=PomodoroSession, dispatch_uid='planner_live_pomodoro')
+def refresh_live_dashboard(sender, instance, using, **kwargs):
+    live.notify(instance.user_id, using)
@@ -0,0 +1,63 @@
+"""
+SQLite production profile.
+
+Selected with SQLITE_PRODUCTION, which switches the SQLite databases to the
+``planner.sqlite`` engine (see ``base.py``). Every connection it opens uses
+the WAL journal, so readers no longer block the writer or each other. It
+also sets ``synchronous=NORMAL``, so commits skip the fsync: a power loss
+can drop the last commits but never corrupts the file. Reads are
+memory-mapped, and the busy timeout is long enough to ride out write
+bursts. Transactions start with ``BEGIN IMMEDIATE``, so they take the write
+lock up front. A deferred transaction that reads first can fail with
+"database is locked" without ever waiting on the busy timeout.
+
+SQLite still allows one writer at a time. When many threads of a process
+write at once, each waits in SQLite's busy handler, which polls with
+growing sleeps, so throughput drops just when load peaks.
+``write_transaction()`` puts hot write paths behind a per-process lock
+instead: writers queue on the lock and each runs its whole transaction in
+one go. Other processes are still coordinated by the busy timeout.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def _write_lock(using):
+    with _write_locks_guard:
+        lock = _write_locks.get(using)
+        if lock is None:
+            lock = _write_locks[using] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS):
+    """
+    ``transaction.atomic(using=using)`` that, on the production engine, is
+    also serialized with the process's other write transactions.
+
+    Calls inside an already open transaction only add a savepoint. The outer
+    transaction may already hold SQLite's write lock, so waiting for the
+    process lock behind it could deadlock.
+    """
+    connection = connections[using]
+    if not getattr(connection, 'serialize_writes', False) or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    lock = _write_lock(using)
+    # Past the busy timeout, fall back to SQLite's own locking rather than wait forever
+    acquired = lock.acquire(timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        if acquired:
+            lock.release()
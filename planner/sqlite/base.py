@@ -0,0 +1,22 @@
+"""
+SQLite database backend for the production profile (see ``planner.sqlite``).
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Tells planner.sqlite.write_transaction to serialize writers
+    serialize_writes = True
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute(f'PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # Take the write lock at BEGIN, while waiting on it still honours busy_timeout
+        self.cursor().execute('BEGIN IMMEDIATE')
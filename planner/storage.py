@@ -0,0 +1,53 @@
+"""
+Content-addressed file storage for syllabus uploads.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+def file_sha256(file):
+    """Return the hex SHA-256 digest of an uploaded file, leaving it rewound."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# A file named after its SHA-256, e.g. syllabi/ab/ab12...ef.pdf
+CONTENT_ADDRESSED_NAME = re.compile(r'(?:^|/)[0-9a-f]{64}(?:\.[^/]*)?$')
+
+
+def is_content_addressed(name):
+    return CONTENT_ADDRESSED_NAME.search(name.replace('\\', '/')) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage where names are derived from file content.
+
+    Saving a file whose content-addressed name already exists is a no-op, so
+    identical uploads share a single copy on disk. Any other name is stored
+    like FileSystemStorage does, with a suffix added when it is taken, since
+    the same name may hold different bytes.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if not is_content_addressed(name):
+            return super().get_available_name(name, max_length)
+        return name
+
+    def _save(self, name, content):
+        if not is_content_addressed(name):
+            return super()._save(name, content)
+        if self.exists(name):
+            return name
+        # Write to a unique temporary name and move it into place atomically,
+        # so concurrent uploads of the same content can't clobber each other
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(partial), self.path(name))
+        return name
@@ -0,0 +1,252 @@
+"""
+Background processing for syllabus uploads.
+
+Document extraction can take seconds per upload, so it runs on a small
+thread pool instead of the request thread. The pool size caps how many
+uploads are extracted at once, which keeps one large PDF from starving
+everyone else.
+
+The queue lives in the web process, so a restart loses whatever was
+queued or running. Uploads left in ``processing`` longer than
+SYLLABUS_PROCESSING_TIMEOUT_MINUTES are picked up again the next time the
+user opens them, or by ``manage.py requeue_uploads``.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search, sharding
+from .ai_utils import iter_topics, score_topics
+from .extraction import iter_document_lines
+from .models import Subject, Topic, SyllabusUpload, ParsedSyllabus
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared thread pool used for background syllabus processing."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SYLLABUS_BACKGROUND_WORKERS,
+                thread_name_prefix='syllabus'
+            )
+        return _executor
+
+
+# Topics are inserted in batches of this size
+TOPIC_BATCH_SIZE = 500
+
+
+def import_topics(user, topics):
+    """
+    Bulk-create subjects and topics for extracted syllabus items.
+
+    The whole import runs in one transaction. Subjects are resolved through an
+    in-memory map with a single bulk insert for new names, and topics that
+    already exist for the same subject and chapter are skipped, so importing a
+    syllabus twice doesn't duplicate anything. Returns the number of topics created.
+    """
+    topics = list(topics)
+    names = list(dict.fromkeys(item['subject'] for item in topics))
+    db = router.db_for_write(Subject, instance=user)
+
+    with transaction.atomic(using=db):
+        subjects = {}
+        for subject in Subject.objects.filter(user=user, name__in=names).order_by('pk'):
+            subjects.setdefault(subject.name, subject)
+
+        missing = [name for name in names if name not in subjects]
+        if missing:
+            Subject.objects.bulk_create([Subject(user=user, name=name) for name in missing])
+            # Re-read rather than rely on bulk_create returning primary keys
+            for subject in Subject.objects.filter(user=user, name__in=missing).order_by('pk'):
+                subjects.setdefault(subject.name, subject)
+
+        existing = set(Topic.objects.filter(
+            subject__in=subjects.values()
+        ).values_list('subject_id', 'chapter', 'name'))
+
+        new_topics = []
+        for item in topics:
+            subject = subjects[item['subject']]
+            key = (subject.pk, item['chapter'], item['topic'])
+            if key in existing:
+                continue
+            existing.add(key)
+            new_topics.append(Topic(
+                subject=subject,
+                chapter=item['chapter'],
+                name=item['topic'],
+                difficulty_score=item['difficulty'],
+                estimated_hours=item['estimated_hours']
+            ))
+
+        Topic.objects.bulk_create(new_topics, batch_size=TOPIC_BATCH_SIZE)
+        if any(topic.pk is None for topic in new_topics):
+            # This database doesn't return primary keys from bulk inserts; look them up
+            pks = {
+                (subject_id, chapter, name): pk
+                for pk, subject_id, chapter, name in Topic.objects.filter(
+                    subject__in=subjects.values(),
+                    name__in={topic.name for topic in new_topics}
+                ).values_list('pk', 'subject_id', 'chapter', 'name')
+            }
+            for topic in new_topics:
+                topic.pk = pks[(topic.subject_id, topic.chapter, topic.name)]
+        # bulk_create skips post_save, so index the new topics explicitly
+        search.index_documents([search.topic_document(t) for t in new_topics], db)
+
+    return len(new_topics)
+
+
+@contextmanager
+def _local_path(field_file):
+    """Yield a filesystem path for ``field_file``, copying it locally if needed."""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+
+    if path:
+        yield path
+        return
+
+    suffix = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        with field_file.open('rb') as source:
+            shutil.copyfileobj(source, tmp)
+        tmp.flush()
+        yield tmp.name
+
+
+def extract_upload_topics(syllabus, metrics):
+    """Yield topics parsed from the file attached to ``syllabus``."""
+    with _local_path(syllabus.file) as path:
+        lines = iter_document_lines(
+            path,
+            metrics,
+            max_pages=settings.SYLLABUS_MAX_PAGES,
+            pages_per_task=settings.SYLLABUS_PDF_PAGES_PER_TASK,
+            workers=settings.SYLLABUS_PDF_WORKERS
+        )
+        yield from iter_topics(lines)
+
+
+# The parts of a topic that depend only on the file; scores are not cached
+PARSED_TOPIC_FIELDS = ('subject', 'chapter', 'topic')
+
+
+def cache_parsed_topics(content_hash, topics):
+    """Cache the subject/chapter/topic structure parsed from a file."""
+    ParsedSyllabus.objects.get_or_create(
+        content_hash=content_hash,
+        defaults={'topics': [{field: item[field] for field in PARSED_TOPIC_FIELDS} for item in topics]}
+    )
+
+
+def get_cached_topics(content_hash):
+    """
+    Return the cached topic list for a file hash, or None on a miss.
+
+    Topics are scored again on every hit, so a retrained topic model or a
+    new heuristic applies to files parsed before it.
+    """
+    if not content_hash:
+        return None
+    topics = ParsedSyllabus.objects.filter(
+        content_hash=content_hash
+    ).values_list('topics', flat=True).first()
+    if topics is None:
+        return None
+    return list(score_topics([{field: item[field] for field in PARSED_TOPIC_FIELDS} for item in topics]))
+
+
+def process_upload(upload_id, user_id):
+    """Extract and import the topics of an uploaded document."""
+    close_old_connections()
+    try:
+        with sharding.for_user(user_id):
+            try:
+                _process_upload(upload_id)
+            except Exception as e:
+                # Never leave the upload in 'processing' after an error nobody will see
+                logger.exception('Processing syllabus upload %s failed', upload_id)
+                SyllabusUpload.objects.filter(pk=upload_id).update(status='failed', error_message=str(e))
+    finally:
+        # Shards and default may all have been touched from this pool thread
+        connections.close_all()
+
+
+def _process_upload(upload_id):
+    syllabus = SyllabusUpload.objects.select_related('user').get(pk=upload_id)
+    metrics = {}
+    try:
+        topics = get_cached_topics(syllabus.content_hash)
+        metrics['cache_hit'] = topics is not None
+        if topics is None:
+            # Parse fully before importing so the import transaction stays short
+            topics = list(extract_upload_topics(syllabus, metrics))
+            if syllabus.content_hash:
+                cache_parsed_topics(syllabus.content_hash, topics)
+        metrics['topics'] = import_topics(syllabus.user, topics)
+    except Exception as e:
+        syllabus.status = 'failed'
+        syllabus.error_message = str(e)
+    else:
+        syllabus.status = 'processed'
+        syllabus.processed = True
+
+    page_seconds = metrics.get('page_seconds')
+    if page_seconds:
+        metrics['slowest_page_seconds'] = max(page_seconds)
+        metrics['mean_page_seconds'] = round(sum(page_seconds) / len(page_seconds), 4)
+    syllabus.extraction_stats = metrics
+    syllabus.save()
+
+
+def claimable_uploads():
+    """
+    Uploads that may be queued: pending ones, and ones stuck in 'processing'
+    past SYLLABUS_PROCESSING_TIMEOUT_MINUTES (their worker died or was lost
+    in a restart). Re-running an upload that was merely slow is harmless,
+    since ``import_topics`` skips topics that already exist.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.SYLLABUS_PROCESSING_TIMEOUT_MINUTES)
+    return SyllabusUpload.objects.filter(
+        Q(status='pending') |
+        Q(status='processing', processing_started_at__lt=cutoff) |
+        Q(status='processing', processing_started_at__isnull=True)
+    )
+
+
+def enqueue_upload(syllabus):
+    """
+    Queue ``syllabus`` for background processing.
+    Returns False if it has already been picked up and isn't stale.
+    """
+    claimed = claimable_uploads().filter(pk=syllabus.pk).update(
+        status='processing',
+        processing_started_at=timezone.now()
+    )
+
+    if claimed:
+        transaction.on_commit(
+            lambda: get_executor().submit(process_upload, syllabus.pk, syllabus.user_id),
+            using=router.db_for_write(SyllabusUpload, instance=syllabus)
+        )
+    return bool(claimed)
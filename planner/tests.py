@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .models import GeneratedQuestion, Subject, Topic, UserProfile
+from .views import metrics
+
+
+class QuestionGenerationTests(TestCase):
+    """Generating questions with the default (template) backend."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+        UserProfile.objects.create(user=self.user)
+        subject = Subject.objects.create(user=self.user, name='Biology')
+        self.topic = Topic.objects.create(subject=subject, chapter='Chapter 1', name='Photosynthesis')
+        self.client.force_login(self.user)
+
+    def generate(self, question_type='mcq', num_questions=5):
+        return self.client.post(reverse('planner:generate_questions'), {
+            'topic': self.topic.pk,
+            'question_type': question_type,
+            'difficulty': 'medium',
+            'num_questions': num_questions,
+        })
+
+    def test_repeat_generation_adds_new_questions(self):
+        for question_type in ('mcq', 'short', 'long'):
+            with self.subTest(question_type=question_type):
+                self.generate(question_type)
+                self.generate(question_type)
+                self.assertEqual(
+                    GeneratedQuestion.objects.filter(topic=self.topic, question_type=question_type).count(),
+                    10
+                )
+
+    def test_exhausted_generator_reports_no_new_questions(self):
+        # The template backend has 36 distinct short questions per topic
+        self.generate('short', 20)
+        self.generate('short', 20)
+        self.assertEqual(GeneratedQuestion.objects.filter(topic=self.topic).count(), 36)
+
+        response = self.generate('short', 20)
+        self.assertEqual(GeneratedQuestion.objects.filter(topic=self.topic).count(), 36)
+        # Earlier messages are still queued, since the redirects weren't followed
+        self.assertEqual(list(get_messages(response.wsgi_request))[-1].level_tag, 'warning')
+
+    def test_pool_serves_other_students(self):
+        self.generate('mcq')
+        other = User.objects.create_user('classmate')
+        UserProfile.objects.create(user=other)
+        topic = Topic.objects.create(
+            subject=Subject.objects.create(user=other, name='Biology'),
+            chapter='Chapter 1',
+            name='Photosynthesis'
+        )
+        self.client.force_login(other)
+        with mock.patch('planner.question_cache.generate_questions') as generate:
+            self.client.post(reverse('planner:generate_questions'), {
+                'topic': topic.pk, 'question_type': 'mcq', 'difficulty': 'medium', 'num_questions': 5,
+            })
+        generate.assert_not_called()
+        self.assertEqual(GeneratedQuestion.objects.filter(topic=topic).count(), 5)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, METRICS_ALLOWED_IPS=['10.0.0.5'], METRICS_BEARER_TOKEN='')
+class MetricsAccessTests(TestCase):
+    """Who may scrape /metrics/ behind a reverse proxy."""
+
+    def scrape(self, **meta):
+        request = RequestFactory().get('/metrics/', REMOTE_ADDR='192.168.0.2', **meta)
+        try:
+            return metrics(request).status_code
+        except Http404:
+            return 404
+
+    def test_without_trusted_proxies_the_proxy_address_is_the_client(self):
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR='10.0.0.5'), 404)
+
+    @override_settings(METRICS_TRUSTED_PROXY_HOPS=1)
+    def test_client_address_comes_from_the_trusted_proxy_hop(self):
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR='10.0.0.5'), 200)
+        # A spoofed entry to the left of what the proxy appended is ignored
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR='10.0.0.5, 203.0.113.9'), 404)
+        self.assertEqual(self.scrape(), 404)
+
+    @override_settings(METRICS_BEARER_TOKEN='s3cret')
+    def test_bearer_token(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer s3cret'), 200)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong'), 404)
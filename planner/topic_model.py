@@ -0,0 +1,181 @@
+"""
+Local learned model for topic difficulty and estimated study hours.
+
+Topics are turned into hashed word and bigram features, and two linear
+regressions (difficulty, hours) are fitted with NumPy. The trained weights
+are stored as a single ``.npy`` file, memory-mapped once per process and
+reloaded only when the file changes.
+"""
+import math
+import os
+import re
+import threading
+import zlib
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - the keyword heuristic is used instead
+    np = None
+
+
+FEATURE_BITS = 18
+FEATURE_DIM = 1 << FEATURE_BITS
+# The last weight column is the bias; every row gets a constant feature there
+BIAS_INDEX = FEATURE_DIM
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Row order of the weight matrix
+TARGETS = ('difficulty', 'hours')
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode('utf-8')) & (FEATURE_DIM - 1)
+
+
+def featurize(topics):
+    """
+    Build a sparse feature matrix for ``(topic_name, chapter_name)`` pairs.
+
+    Returns ``(rows, cols, values)`` arrays in coordinate format. Each row is
+    scaled to unit length so long and short topic names weigh the same.
+    """
+    rows, cols, values = [], [], []
+    for row, (name, chapter) in enumerate(topics):
+        words = TOKEN_PATTERN.findall(name.lower())
+        features = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+        features += ['ch:' + word for word in TOKEN_PATTERN.findall(chapter.lower())]
+        ids = {_hash(feature) for feature in features}
+
+        scale = 1.0 / math.sqrt(len(ids)) if ids else 0.0
+        rows.extend([row] * (len(ids) + 1))
+        cols.extend(ids)
+        cols.append(BIAS_INDEX)
+        values.extend([scale] * len(ids))
+        values.append(1.0)
+
+    return (
+        np.asarray(rows, dtype=np.int64),
+        np.asarray(cols, dtype=np.int64),
+        np.asarray(values, dtype=np.float32),
+    )
+
+
+def _sparse_dot(weights, rows, cols, values, n):
+    """Multiply the sparse feature matrix by one weight vector."""
+    return np.bincount(rows, weights=weights[cols] * values, minlength=n)
+
+
+class TopicModel:
+    """Linear difficulty/hours predictor over hashed n-gram features."""
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, topics):
+        """
+        Predict ``(difficulties, hours)`` lists for ``(name, chapter)`` pairs.
+        The whole batch is scored with one sparse product per target.
+        """
+        topics = list(topics)
+        if not topics:
+            return [], []
+        rows, cols, values = featurize(topics)
+        n = len(topics)
+        difficulty = _sparse_dot(self.weights[0], rows, cols, values, n)
+        hours = _sparse_dot(self.weights[1], rows, cols, values, n)
+        return (
+            np.clip(np.rint(difficulty), 1, 10).astype(int).tolist(),
+            np.clip(np.round(hours, 1), 0.5, 40.0).tolist(),
+        )
+
+    def save(self, path):
+        """Write the weights atomically so running processes never see a partial file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f'{path}.part'
+        with open(partial, 'wb') as handle:
+            np.save(handle, np.asarray(self.weights, dtype=np.float32))
+        os.replace(partial, path)
+
+
+def effort_difficulties(hours):
+    """
+    Derive 1-10 difficulty labels from observed study hours.
+
+    A topic's label is its percentile rank by hours among ``hours`` (ties
+    share their mean rank), so difficulty is learned from how long students
+    actually took rather than from scores the heuristic or an earlier model
+    assigned.
+    """
+    hours = np.asarray(hours, dtype=np.float64)
+    n = len(hours)
+    if n < 2:
+        return [5] * n
+    ranks = np.empty(n)
+    ranks[hours.argsort(kind='stable')] = np.arange(n)
+    _, groups = np.unique(hours, return_inverse=True)
+    ranks = (np.bincount(groups, weights=ranks) / np.bincount(groups))[groups]
+    return (1 + np.rint(9 * ranks / (n - 1))).astype(int).tolist()
+
+
+def train(topics, difficulties, hours, epochs=150, learning_rate=0.5, l2=1e-5):
+    """
+    Fit a TopicModel with full-batch AdaGrad on squared error.
+
+    ``topics`` are ``(name, chapter)`` pairs; ``difficulties`` and ``hours``
+    are the observed targets for each topic.
+    """
+    rows, cols, values = featurize(topics)
+    n = len(topics)
+    weights = np.zeros((len(TARGETS), FEATURE_DIM + 1), dtype=np.float64)
+
+    for target_index, target in enumerate((difficulties, hours)):
+        target = np.asarray(target, dtype=np.float64)
+        w = weights[target_index]
+        w[BIAS_INDEX] = target.mean()
+        squared_grads = np.full_like(w, 1e-8)
+        for _ in range(epochs):
+            error = _sparse_dot(w, rows, cols, values, n) - target
+            grad = np.bincount(cols, weights=error[rows] * values, minlength=FEATURE_DIM + 1) / n
+            grad[:BIAS_INDEX] += l2 * w[:BIAS_INDEX]
+            squared_grads += grad * grad
+            w -= learning_rate * grad / np.sqrt(squared_grads)
+
+    return TopicModel(weights.astype(np.float32))
+
+
+_loaded = None
+_loaded_key = None
+_load_lock = threading.Lock()
+
+
+def load_model(path):
+    """Memory-map a saved model, or return None if it is missing or incompatible."""
+    weights = np.load(path, mmap_mode='r')
+    if weights.shape != (len(TARGETS), FEATURE_DIM + 1):
+        return None
+    return TopicModel(weights)
+
+
+def get_topic_model():
+    """
+    Return the process-wide TopicModel, or None when no model is available.
+    The artifact is mapped once and only reopened after it is retrained.
+    """
+    global _loaded, _loaded_key
+    if np is None:
+        return None
+
+    path = str(settings.TOPIC_MODEL_PATH)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _load_lock:
+        if key != _loaded_key:
+            _loaded = load_model(path)
+            _loaded_key = key
+        return _loaded
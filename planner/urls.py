@@ -13,6 +13,7 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/stream/', views.dashboard_stream, name='dashboard_stream'),
     path('profile/', views.profile, name='profile'),
     
     # Syllabus Management
@@ -37,6 +38,7 @@ urlpatterns = [
     path('tasks/<int:pk>/update/', views.task_update, name='task_update'),
     path('tasks/<int:pk>/complete/', views.task_complete, name='task_complete'),
     path('tasks/<int:pk>/miss/', views.task_miss, name='task_miss'),
+    path('tasks/bulk/', views.task_bulk_update, name='task_bulk_update'),
     
     # Revisions
     path('revisions/', views.revision_list, name='revision_list'),
@@ -45,17 +47,27 @@ urlpatterns = [
     # Pomodoro
     path('pomodoro/', views.pomodoro_timer, name='pomodoro_timer'),
     path('pomodoro/log/', views.pomodoro_log, name='pomodoro_log'),
+    path('pomodoro/sync/', views.pomodoro_sync, name='pomodoro_sync'),
     path('pomodoro/sessions/', views.pomodoro_sessions, name='pomodoro_sessions'),
     
     # Questions
     path('questions/', views.question_bank, name='question_bank'),
     path('questions/generate/', views.generate_questions, name='generate_questions'),
     path('questions/<int:pk>/', views.question_detail, name='question_detail'),
+    path('quiz/', views.quiz_start, name='quiz_start'),
+    path('quiz/question/', views.quiz_question, name='quiz_question'),
+    path('quiz/finish/', views.quiz_finish, name='quiz_finish'),
     
     # Analytics
     path('analytics/', views.analytics, name='analytics'),
     path('analytics/data/', views.analytics_data, name='analytics_data'),
     
+    # Search
+    path('search/', views.search, name='search'),
+    
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
+    
     # Gamification
     path('badges/', views.badges, name='badges'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
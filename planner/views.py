@@ -2,7 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.db.models import Count, Sum, Q, Avg
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -21,6 +23,11 @@ from .ai_utils import (
     predict_topic_difficulty, generate_questions as ai_generate_questions, 
     calculate_productivity_score, check_badge_eligibility
 )
+from . import live
+from .decorators import async_login_required
+from .metrics import can_scrape, render as render_metrics
+from .search import search as search_documents
+from .tasks import enqueue_upload, get_cached_topics, import_topics
 
 
 # Authentication Views
@@ -37,9 +44,9 @@ def register(request):
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
             user = form.save()
+            login(request, user)
             # Create user profile
             UserProfile.objects.create(user=user)
-            login(request, user)
             messages.success(request, 'Registration successful! Welcome to AI Study Planner.')
             return redirect('planner:profile')
     else:
@@ -116,6 +123,20 @@ def dashboard(request):
     return render(request, 'planner/dashboard.html', context)
 
 
+@async_login_required
+async def dashboard_stream(request):
+    """Server-sent events with the dashboard numbers that changed (see ``planner.live``)."""
+    if not isinstance(request, ASGIRequest):
+        # A stream would tie up a WSGI worker thread for as long as the page is open;
+        # 204 tells EventSource not to reconnect, and the page keeps its rendered numbers
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(live.dashboard_events(request.user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def profile(request):
     """User profile management."""
@@ -161,40 +182,38 @@ def process_syllabus(request, upload_id):
     """Process uploaded syllabus and extract topics."""
     syllabus = get_object_or_404(SyllabusUpload, id=upload_id, user=request.user)
     
+    if syllabus.status == 'failed':
+        messages.error(request, f'Error reading file: {syllabus.error_message}')
+        return redirect('planner:upload_syllabus')
+    
     if not syllabus.processed:
-        # Extract text from file if needed
         text_content = syllabus.text_content
         
         if syllabus.file and not text_content:
-            # Simple text extraction (for production, use proper PDF/DOCX parsers)
-            try:
-                if syllabus.file.name.endswith('.txt'):
-                    text_content = syllabus.file.read().decode('utf-8')
-                else:
-                    text_content = "Sample syllabus content for processing"
-            except Exception as e:
-                messages.error(request, f'Error reading file: {str(e)}')
-                return redirect('planner:upload_syllabus')
+            # A file seen before goes straight to the import
+            cached = get_cached_topics(syllabus.content_hash)
+            if cached is not None:
+                import_topics(request.user, cached)
+                syllabus.processed = True
+                syllabus.status = 'processed'
+                syllabus.extraction_stats = {'cache_hit': True, 'topics': len(cached)}
+                syllabus.save()
+                messages.success(request, f'Successfully extracted {len(cached)} topics!')
+                return redirect('planner:topic_list')
+            
+            # Documents are extracted in the background, off the request thread
+            if enqueue_upload(syllabus) or syllabus.status == 'processing':
+                messages.info(request, 'Your syllabus is being processed. Topics will appear here shortly.')
+            return redirect('planner:topic_list')
         
         # Extract topics using AI
         extracted_topics = extract_topics_from_text(text_content)
         
         # Create subjects and topics
-        for item in extracted_topics:
-            subject, _ = Subject.objects.get_or_create(
-                user=request.user,
-                name=item['subject']
-            )
-            
-            Topic.objects.create(
-                subject=subject,
-                chapter=item['chapter'],
-                name=item['topic'],
-                difficulty_score=item['difficulty'],
-                estimated_hours=item['estimated_hours']
-            )
+        import_topics(request.user, extracted_topics)
         
         syllabus.processed = True
+        syllabus.status = 'processed'
         syllabus.save()
         
         messages.success(request, f'Successfully extracted {len(extracted_topics)} topics!')
@@ -305,14 +324,39 @@ def topic_delete(request, pk):
     return render(request, 'planner/topic_confirm_delete.html', {'topic': topic})
 
 
+# Search
+@login_required
+def search(request):
+    """Ranked full-text search across the user's topics, questions and task notes."""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    return JsonResponse({
+        'query': query,
+        'results': search_documents(request.user, query, limit),
+    })
+
+
+# Monitoring
+def metrics(request):
+    """Per-view request metrics in Prometheus text format, for authorized scrapers only."""
+    if not settings.REQUEST_METRICS_ENABLED or not can_scrape(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # Import additional views from separate modules
 from .views_schedule import (
     generate_schedule, schedule_calendar, tasks_today, task_update,
-    task_complete, task_miss, revision_list, revision_complete,
-    pomodoro_timer, pomodoro_log, pomodoro_sessions
+    task_complete, task_miss, task_bulk_update, revision_list, revision_complete,
+    pomodoro_timer, pomodoro_log, pomodoro_sync, pomodoro_sessions
 )
 
 from .views_analytics import (
     question_bank, generate_questions, question_detail,
+    quiz_start, quiz_question, quiz_finish,
     analytics, analytics_data, badges, leaderboard
 )
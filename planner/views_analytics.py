@@ -5,25 +5,58 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncDate
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timedelta
+from itertools import chain
 import json
 
 from .models import (
     UserProfile, Subject, Topic, StudyTask, RevisionTask,
     PomodoroSession, GeneratedQuestion, Badge
 )
-from .forms import QuestionGeneratorForm
-from .ai_utils import generate_questions as ai_generate_questions
+from . import quiz, search, sharding
+from .decorators import async_login_required
+from .dedup import save_questions
+from .forms import QuestionGeneratorForm, QuizStartForm
+from .question_cache import get_questions
+from .routers import replica_reads
+
+
+# Questions shown per question bank page
+QUESTION_BANK_PAGE_SIZE = 50
+
+
+def encode_cursor(question):
+    """Encode a question's (created_at, id) position as an opaque page cursor."""
+    raw = f'{question.created_at.isoformat()}|{question.pk}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) encoded in ``cursor``, or None if it is invalid."""
+    try:
+        created_at, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        return (created_at, int(pk)) if created_at else None
+    except (ValueError, TypeError):
+        return None
 
 
 @login_required
+@replica_reads
 def question_bank(request):
-    """Display question bank with filters."""
+    """Display question bank with filters, paginated by (created_at, id) keyset."""
     questions = GeneratedQuestion.objects.filter(
-        topic__subject__user=request.user
-    ).select_related('topic', 'topic__subject')
+        user=request.user
+    ).select_related('topic', 'topic__subject').only(
+        'id', 'question_type', 'difficulty', 'question_text', 'created_at',
+        'topic__name', 'topic__subject__name'
+    ).order_by('-created_at', '-id')
     
     # Apply filters
     subject_id = request.GET.get('subject')
@@ -31,25 +64,72 @@ def question_bank(request):
     difficulty = request.GET.get('difficulty')
     
     if subject_id:
-        questions = questions.filter(topic__subject_id=subject_id)
+        questions = questions.filter(subject_id=subject_id)
     if question_type:
         questions = questions.filter(question_type=question_type)
     if difficulty:
         questions = questions.filter(difficulty=difficulty)
     
+    # Seek past the last row of the previous page instead of using OFFSET
+    position = decode_cursor(request.GET.get('cursor', ''))
+    if position:
+        created_at, pk = position
+        questions = questions.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    
+    page = list(questions[:QUESTION_BANK_PAGE_SIZE + 1])
+    next_query = None
+    if len(page) > QUESTION_BANK_PAGE_SIZE:
+        page = page[:QUESTION_BANK_PAGE_SIZE]
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(page[-1])
+        next_query = params.urlencode()
+    
     subjects = Subject.objects.filter(user=request.user)
     
     context = {
-        'questions': questions,
+        'questions': page,
         'subjects': subjects,
         'selected_subject': subject_id,
         'selected_type': question_type,
         'selected_difficulty': difficulty,
+        'next_query': next_query,
+        'is_first_page': position is None,
     }
     
     return render(request, 'planner/question_bank.html', context)
 
 
+def build_question(user, topic, q, question_type, difficulty):
+    """Turn a generated question dict into an unsaved GeneratedQuestion."""
+    if q['type'] == 'mcq':
+        return GeneratedQuestion(
+            user=user,
+            topic=topic,
+            subject_id=topic.subject_id,
+            question_type='mcq',
+            difficulty=difficulty,
+            question_text=q['question'],
+            option_a=q['options']['A'],
+            option_b=q['options']['B'],
+            option_c=q['options']['C'],
+            option_d=q['options']['D'],
+            correct_answer=q['correct_answer'],
+            explanation=q['explanation']
+        )
+    return GeneratedQuestion(
+        user=user,
+        topic=topic,
+        subject_id=topic.subject_id,
+        question_type=question_type,
+        difficulty=difficulty,
+        question_text=q['question'],
+        correct_answer=q.get('answer', ''),
+        explanation=q['explanation']
+    )
+
+
 @login_required
 def generate_questions(request):
     """Generate AI questions for a topic."""
@@ -61,40 +141,31 @@ def generate_questions(request):
             difficulty = form.cleaned_data['difficulty']
             num_questions = form.cleaned_data['num_questions']
             
-            # Generate questions using AI
-            generated = ai_generate_questions(
+            # Generate questions using AI, served from the shared cache when possible
+            generated = get_questions(
                 topic.name,
                 question_type,
                 difficulty,
-                num_questions
+                num_questions,
+                exclude=GeneratedQuestion.objects.filter(topic=topic).values_list('question_text', flat=True)
             )
             
-            # Save to database
-            for q in generated:
-                if q['type'] == 'mcq':
-                    GeneratedQuestion.objects.create(
-                        topic=topic,
-                        question_type='mcq',
-                        difficulty=difficulty,
-                        question_text=q['question'],
-                        option_a=q['options']['A'],
-                        option_b=q['options']['B'],
-                        option_c=q['options']['C'],
-                        option_d=q['options']['D'],
-                        correct_answer=q['correct_answer'],
-                        explanation=q['explanation']
-                    )
-                else:
-                    GeneratedQuestion.objects.create(
-                        topic=topic,
-                        question_type=question_type,
-                        difficulty=difficulty,
-                        question_text=q['question'],
-                        correct_answer=q.get('answer', ''),
-                        explanation=q['explanation']
-                    )
+            # Save to database, skipping near-duplicates of questions already in the bank
+            created, rejected = save_questions(topic, [
+                build_question(request.user, topic, q, question_type, difficulty) for q in generated
+            ])
+            search.index_documents([search.question_document(q) for q in created], topic._state.db)
             
-            messages.success(request, f'Generated {num_questions} questions successfully!')
+            if created:
+                messages.success(request, f'Generated {len(created)} questions successfully!')
+            else:
+                messages.warning(
+                    request,
+                    'No new questions could be generated: you already have every question available '
+                    'for this topic, type and difficulty. Try another type or difficulty.'
+                )
+            if rejected:
+                messages.info(request, f'Skipped {rejected} questions too similar to ones you already have.')
             return redirect('planner:question_bank')
     else:
         form = QuestionGeneratorForm(request.user)
@@ -114,6 +185,105 @@ def question_detail(request, pk):
 
 
 @login_required
+def quiz_start(request):
+    """Start an adaptive quiz from the user's question bank."""
+    state = request.session.get(quiz.SESSION_KEY)
+    
+    if request.method == 'POST':
+        form = QuizStartForm(request.user, request.POST)
+        if form.is_valid():
+            state = quiz.build_quiz(
+                request.user,
+                form.cleaned_data['num_questions'],
+                topic=form.cleaned_data['topic'],
+                question_type=form.cleaned_data['question_type']
+            )
+            if state is None:
+                messages.error(request, 'No questions match. Generate some questions first!')
+            else:
+                request.session[quiz.SESSION_KEY] = state
+                return redirect('planner:quiz_question')
+    else:
+        form = QuizStartForm(request.user)
+    
+    return render(request, 'planner/quiz_start.html', {'form': form, 'active_quiz': state})
+
+
+def _quiz_results(request, state):
+    """Save a finished quiz and render its results."""
+    results = quiz.finish_quiz(request.user, state)
+    request.session.pop(quiz.SESSION_KEY, None)
+    return render(request, 'planner/quiz_results.html', {'results': results})
+
+
+@login_required
+def quiz_question(request):
+    """Show the current quiz question and grade answers to it."""
+    state = request.session.get(quiz.SESSION_KEY)
+    if state is None:
+        return redirect('planner:quiz_start')
+    
+    question = None
+    if state['current'] is not None:
+        question = GeneratedQuestion.objects.filter(pk=state['current'], user=request.user).first()
+    
+    if request.method == 'POST' and question is not None:
+        if question.question_type == 'mcq':
+            answer = request.POST.get('answer', '')
+            correct = answer.upper() == question.correct_answer.strip().upper()
+        else:
+            # Open questions are self-assessed against the model answer
+            answer = ''
+            correct = request.POST.get('self_assessment') == 'correct'
+        
+        quiz.record_answer(state, question, correct)
+        state['current'] = None
+        state['last'] = {
+            'question': question.question_text,
+            'answer': answer,
+            'correct': correct,
+            'correct_answer': question.correct_answer,
+            'explanation': question.explanation,
+        }
+        request.session.modified = True
+        if quiz.is_finished(state):
+            return _quiz_results(request, state)
+        return redirect('planner:quiz_question')
+    
+    # Draw until we find a question that still exists (it may have been deleted)
+    while question is None:
+        state['current'] = quiz.next_question_id(state)
+        request.session.modified = True
+        if state['current'] is None:
+            return _quiz_results(request, state)
+        question = GeneratedQuestion.objects.filter(pk=state['current'], user=request.user).first()
+    
+    context = {
+        'question': question,
+        'question_options': [
+            ('A', question.option_a), ('B', question.option_b),
+            ('C', question.option_c), ('D', question.option_d),
+        ],
+        'last': state['last'],
+        'number': len(state['attempts']) + 1,
+        'length': state['length'],
+        'level': quiz.LEVELS[state['level']],
+    }
+    return render(request, 'planner/quiz_question.html', context)
+
+
+@login_required
+@require_POST
+def quiz_finish(request):
+    """End the current quiz early and save the answers so far."""
+    state = request.session.get(quiz.SESSION_KEY)
+    if state is None:
+        return redirect('planner:quiz_start')
+    return _quiz_results(request, state)
+
+
+@login_required
+@replica_reads
 def analytics(request):
     """Analytics dashboard."""
     profile = request.user.profile
@@ -204,9 +374,23 @@ def analytics(request):
     return render(request, 'planner/analytics.html', context)
 
 
-@login_required
-def analytics_data(request):
-    """API endpoint for analytics data."""
+async def daily_counts(queryset, field, start_date, end_date):
+    """Count ``queryset`` rows per day of ``field`` between two dates, in one grouped query."""
+    rows = queryset.filter(
+        **{f'{field}__date__range': (start_date, end_date)}
+    ).annotate(day=TruncDate(field)).values('day').annotate(count=Count('id')).order_by()
+    return {row['day']: row['count'] async for row in rows}
+
+
+@async_login_required
+@replica_reads
+async def analytics_data(request):
+    """
+    API endpoint for analytics data.
+    
+    Async, since the analytics charts poll it: three grouped queries on the
+    async ORM cover the whole date range.
+    """
     today = timezone.now().date()
     
     # Get date range
@@ -214,37 +398,28 @@ def analytics_data(request):
     start_date = today - timedelta(days=days-1)
     
     # Collect data
+    pomodoros = await daily_counts(
+        PomodoroSession.objects.filter(user=request.user, completed=True),
+        'started_at', start_date, today
+    )
+    tasks = await daily_counts(StudyTask.objects.filter(user=request.user), 'completed_at', start_date, today)
+    revisions = await daily_counts(RevisionTask.objects.filter(user=request.user), 'completed_at', start_date, today)
+    
     data = []
     for i in range(days):
         date = start_date + timedelta(days=i)
-        
-        pomodoros = PomodoroSession.objects.filter(
-            user=request.user,
-            started_at__date=date,
-            completed=True
-        ).count()
-        
-        tasks = StudyTask.objects.filter(
-            user=request.user,
-            completed_at__date=date
-        ).count()
-        
-        revisions = RevisionTask.objects.filter(
-            user=request.user,
-            completed_at__date=date
-        ).count()
-        
         data.append({
             'date': date.strftime('%Y-%m-%d'),
-            'pomodoros': pomodoros,
-            'tasks': tasks,
-            'revisions': revisions
+            'pomodoros': pomodoros.get(date, 0),
+            'tasks': tasks.get(date, 0),
+            'revisions': revisions.get(date, 0)
         })
     
     return JsonResponse({'data': data})
 
 
 @login_required
+@replica_reads
 def badges(request):
     """Display user badges and achievements."""
     user_badges = Badge.objects.filter(user=request.user).order_by('-earned_at')
@@ -339,14 +514,20 @@ def badges(request):
 
 
 @login_required
+@replica_reads
 def leaderboard(request):
     """Display leaderboard (optional feature)."""
-    top_users = UserProfile.objects.select_related('user').order_by('-total_xp')[:10]
+    # Profiles may be spread over shards: take each shard's top 10 and merge
+    per_shard = sharding.scatter(
+        lambda: list(UserProfile.objects.select_related('user').order_by('-total_xp')[:10])
+    )
+    top_users = sorted(chain.from_iterable(per_shard), key=lambda p: p.total_xp, reverse=True)[:10]
     
     # Get current user rank
-    user_rank = UserProfile.objects.filter(
-        total_xp__gt=request.user.profile.total_xp
-    ).count() + 1
+    total_xp = request.user.profile.total_xp
+    user_rank = sum(sharding.scatter(
+        lambda: UserProfile.objects.filter(total_xp__gt=total_xp).count()
+    )) + 1
     
     context = {
         'top_users': top_users,
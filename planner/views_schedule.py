@@ -4,15 +4,26 @@ Schedule and task management views.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.db import router
+from django.db.models import Count
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST
 from datetime import datetime, timedelta
+import json
+
+from asgiref.sync import sync_to_async
 
 from .models import (
     UserProfile, Subject, Topic, StudyTask, RevisionTask,
     PomodoroSession, GeneratedQuestion, Badge
 )
 from .forms import ScheduleGeneratorForm, QuestionGeneratorForm
+from . import live
+from .sqlite import write_transaction
+from .decorators import async_login_required
+from .routers import replica_reads
 from .ai_utils import (
     generate_study_schedule, calculate_revision_dates,
     generate_questions as ai_generate_questions,
@@ -20,6 +31,18 @@ from .ai_utils import (
 )
 
 
+def parse_id(value):
+    """Return a client-supplied id as an int, or None if it isn't a positive integer."""
+    # int() alone would accept True and 12.7, and str.isdigit() accepts '²'
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
 @login_required
 def generate_schedule(request):
     """Generate study schedule based on topics and exam date."""
@@ -69,6 +92,7 @@ def generate_schedule(request):
 
 
 @login_required
+@replica_reads
 def schedule_calendar(request):
     """Display study schedule in calendar view."""
     # Get date range
@@ -173,65 +197,223 @@ def task_complete(request, pk):
     """Mark task as completed."""
     task = get_object_or_404(StudyTask, pk=pk, user=request.user)
     
-    task.status = 'completed'
-    task.completed_at = timezone.now()
-    task.save()
-    
-    # Mark topic as completed
-    task.topic.is_completed = True
-    task.topic.completed_at = timezone.now()
-    task.topic.save()
-    
-    # Create revision tasks
-    revision_dates = calculate_revision_dates(task.completed_at.date())
-    for rev_type, rev_date in revision_dates.items():
-        RevisionTask.objects.get_or_create(
-            user=request.user,
-            topic=task.topic,
-            revision_type=rev_type,
-            scheduled_date=rev_date
-        )
-    
-    # Award XP
-    profile = request.user.profile
-    profile.total_xp += 50
-    profile.update_streak()
-    profile.save()
+    with write_transaction(router.db_for_write(StudyTask, instance=request.user)):
+        task.status = 'completed'
+        task.completed_at = timezone.now()
+        task.save()
+        
+        # Mark topic as completed
+        task.topic.is_completed = True
+        task.topic.completed_at = timezone.now()
+        task.topic.save()
+        
+        # Create revision tasks
+        revision_dates = calculate_revision_dates(task.completed_at.date())
+        for rev_type, rev_date in revision_dates.items():
+            RevisionTask.objects.get_or_create(
+                user=request.user,
+                topic=task.topic,
+                revision_type=rev_type,
+                scheduled_date=rev_date
+            )
+        
+        # Award XP
+        profile = request.user.profile
+        profile.total_xp += 50
+        profile.update_streak()
+        profile.save()
     
     messages.success(request, 'Task completed! +50 XP')
     return redirect('planner:tasks_today')
 
 
+# Missed tasks are rescheduled to the next day with fewer tasks than this
+MAX_TASKS_PER_DAY = 5
+
+
 @login_required
 def task_miss(request, pk):
     """Mark task as missed and reschedule."""
     task = get_object_or_404(StudyTask, pk=pk, user=request.user)
     
-    task.status = 'missed'
-    task.save()
-    
-    # Reschedule to next available day
-    next_date = task.scheduled_date + timedelta(days=1)
-    
-    # Find next available slot
-    while StudyTask.objects.filter(
-        user=request.user,
-        scheduled_date=next_date
-    ).count() >= 5:  # Max 5 tasks per day
-        next_date += timedelta(days=1)
-    
-    # Create new task
-    StudyTask.objects.create(
-        user=request.user,
-        topic=task.topic,
-        scheduled_date=next_date,
-        status='pending'
-    )
+    with write_transaction(router.db_for_write(StudyTask, instance=request.user)):
+        task.status = 'missed'
+        task.save()
+        
+        # Reschedule to next available day
+        next_date = task.scheduled_date + timedelta(days=1)
+        
+        # Find next available slot
+        while StudyTask.objects.filter(
+            user=request.user,
+            scheduled_date=next_date
+        ).count() >= MAX_TASKS_PER_DAY:
+            next_date += timedelta(days=1)
+        
+        # Create new task
+        StudyTask.objects.create(
+            user=request.user,
+            topic=task.topic,
+            scheduled_date=next_date,
+            status='pending'
+        )
     
     messages.info(request, f'Task rescheduled to {next_date}')
     return redirect('planner:tasks_today')
 
 
+# Upper bound on tasks accepted by a single bulk update
+TASK_BULK_MAX_BATCH = 500
+
+TASK_BULK_STATUSES = {status for status, _ in StudyTask.STATUS_CHOICES}
+
+
+@login_required
+@require_POST
+def task_bulk_update(request):
+    """
+    Change the status of many tasks at once.
+    
+    Expects a JSON body of the form::
+    
+        {"tasks": [{"id": 12, "status": "completed"}, {"id": 13, "status": "missed"}, ...]}
+    
+    Everything is applied in one transaction: one UPDATE per status, one bulk
+    insert for the revisions of all newly completed topics, one for the
+    rescheduled copies of missed tasks, and a single XP and streak update.
+    The response maps each task id to its outcome.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        entries = payload['tasks']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Expected a JSON body with a "tasks" list.'}, status=400)
+    
+    if not isinstance(entries, list):
+        return JsonResponse({'success': False, 'error': '"tasks" must be a list.'}, status=400)
+    if len(entries) > TASK_BULK_MAX_BATCH:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {TASK_BULK_MAX_BATCH} tasks can be updated per request.'
+        }, status=400)
+    
+    results = {}
+    requested = {}
+    for index, entry in enumerate(entries):
+        task_id = parse_id(entry.get('id')) if isinstance(entry, dict) else None
+        if task_id is None:
+            results[f'#{index}'] = 'invalid id'
+            continue
+        if task_id in requested or str(task_id) in results:
+            results[str(task_id)] = 'duplicate'
+            requested.pop(task_id, None)
+            continue
+        if entry.get('status') not in TASK_BULK_STATUSES:
+            results[str(task_id)] = 'invalid status'
+            continue
+        requested[task_id] = entry['status']
+    
+    now = timezone.now()
+    today = now.date()
+    xp_earned = 0
+    revisions = []
+    rescheduled = {}
+    
+    with write_transaction(router.db_for_write(StudyTask, instance=request.user)):
+        tasks = {
+            task.pk: task for task in StudyTask.objects.filter(
+                user=request.user,
+                pk__in=requested
+            ).only('id', 'topic_id', 'scheduled_date', 'status')
+        }
+        
+        changes = {status: [] for status in TASK_BULK_STATUSES}
+        for task_id, status in requested.items():
+            task = tasks.get(task_id)
+            if task is None:
+                results[str(task_id)] = 'not found'
+            elif task.status == status:
+                results[str(task_id)] = 'unchanged'
+            else:
+                changes[status].append(task)
+                results[str(task_id)] = status
+        
+        completed = changes['completed']
+        if completed:
+            StudyTask.objects.filter(pk__in=[t.pk for t in completed]).update(status='completed', completed_at=now)
+            topic_ids = {t.topic_id for t in completed}
+            Topic.objects.filter(pk__in=topic_ids).update(is_completed=True, completed_at=now)
+            
+            # Every topic gets the same revision dates; insert the ones it doesn't have yet
+            revision_dates = calculate_revision_dates(today)
+            existing = set(RevisionTask.objects.filter(
+                user=request.user,
+                topic_id__in=topic_ids,
+                scheduled_date__in=revision_dates.values()
+            ).values_list('topic_id', 'revision_type', 'scheduled_date'))
+            revisions = [
+                RevisionTask(user=request.user, topic_id=topic_id, revision_type=rev_type, scheduled_date=rev_date)
+                for topic_id in sorted(topic_ids)
+                for rev_type, rev_date in revision_dates.items()
+                if (topic_id, rev_type, rev_date) not in existing
+            ]
+            RevisionTask.objects.bulk_create(revisions)
+            
+            xp_earned = 50 * len(completed)
+            profile = UserProfile.objects.select_for_update().get(user=request.user)
+            profile.total_xp += xp_earned
+            profile.update_streak()
+        
+        if changes['pending']:
+            StudyTask.objects.filter(pk__in=[t.pk for t in changes['pending']]).update(
+                status='pending', completed_at=None
+            )
+        
+        missed = sorted(changes['missed'], key=lambda t: (t.scheduled_date, t.pk))
+        if missed:
+            StudyTask.objects.filter(pk__in=[t.pk for t in missed]).update(status='missed')
+            
+            # Load the day counts and occupied (topic, day) slots once, then
+            # place each missed task like task_miss does
+            later = StudyTask.objects.filter(
+                user=request.user,
+                scheduled_date__gt=missed[0].scheduled_date
+            )
+            per_day = dict(later.values('scheduled_date').annotate(
+                count=Count('id')
+            ).values_list('scheduled_date', 'count'))
+            taken = set(later.filter(
+                topic_id__in={t.topic_id for t in missed}
+            ).values_list('topic_id', 'scheduled_date'))
+            
+            new_tasks = []
+            for task in missed:
+                next_date = task.scheduled_date + timedelta(days=1)
+                while per_day.get(next_date, 0) >= MAX_TASKS_PER_DAY or (task.topic_id, next_date) in taken:
+                    next_date += timedelta(days=1)
+                per_day[next_date] = per_day.get(next_date, 0) + 1
+                taken.add((task.topic_id, next_date))
+                new_tasks.append(StudyTask(
+                    user=request.user,
+                    topic_id=task.topic_id,
+                    scheduled_date=next_date,
+                    status='pending'
+                ))
+                rescheduled[str(task.pk)] = next_date.isoformat()
+            StudyTask.objects.bulk_create(new_tasks)
+        
+        # Set-based updates send no post_save, so refresh live dashboards here
+        live.notify(request.user.pk, router.db_for_write(StudyTask, instance=request.user))
+    
+    return JsonResponse({
+        'success': True,
+        'results': results,
+        'xp_earned': xp_earned,
+        'revisions_created': len(revisions),
+        'rescheduled': rescheduled,
+    })
+
+
 @login_required
 def revision_list(request):
     """List all revision tasks."""
@@ -261,14 +443,15 @@ def revision_complete(request, pk):
     """Mark revision as completed."""
     revision = get_object_or_404(RevisionTask, pk=pk, user=request.user)
     
-    revision.is_completed = True
-    revision.completed_at = timezone.now()
-    revision.save()
-    
-    # Award XP
-    profile = request.user.profile
-    profile.total_xp += 30
-    profile.save()
+    with write_transaction(router.db_for_write(RevisionTask, instance=request.user)):
+        revision.is_completed = True
+        revision.completed_at = timezone.now()
+        revision.save()
+        
+        # Award XP
+        profile = request.user.profile
+        profile.total_xp += 30
+        profile.save()
     
     messages.success(request, 'Revision completed! +30 XP')
     return redirect('planner:revision_list')
@@ -285,40 +468,55 @@ def pomodoro_timer(request):
     return render(request, 'planner/pomodoro_timer.html', {'topics': topics})
 
 
-@login_required
-def pomodoro_log(request):
-    """Log a completed pomodoro session."""
-    if request.method == 'POST':
-        topic_id = request.POST.get('topic_id')
-        duration = int(request.POST.get('duration', 25))
-        
-        topic = None
-        if topic_id:
-            topic = get_object_or_404(Topic, pk=topic_id, subject__user=request.user)
-        
-        session = PomodoroSession.objects.create(
-            user=request.user,
+def record_pomodoro(user, topic, duration):
+    """Save a completed pomodoro and award its XP; returns the user's pomodoro count."""
+    with write_transaction(router.db_for_write(PomodoroSession, instance=user)):
+        PomodoroSession.objects.create(
+            user=user,
             topic=topic,
             duration_minutes=duration,
             completed=True
         )
         
         # Award XP
-        profile = request.user.profile
+        profile = user.profile
         profile.total_xp += 10
         profile.save()
         
         # Check for pomodoro badges
-        total_pomodoros = PomodoroSession.objects.filter(
-            user=request.user,
+        return PomodoroSession.objects.filter(
+            user=user,
             completed=True
         ).count()
+
+
+@async_login_required
+async def pomodoro_log(request):
+    """
+    Log a completed pomodoro session.
+    
+    Async, since the timer page calls it often: lookups use the async ORM,
+    and only the write transaction, which the async ORM can't span, runs in
+    a worker thread.
+    """
+    if request.method == 'POST':
+        topic_id = request.POST.get('topic_id')
+        duration = int(request.POST.get('duration', 25))
+        
+        topic = None
+        if topic_id:
+            try:
+                topic = await Topic.objects.aget(pk=topic_id, subject__user=request.user)
+            except Topic.DoesNotExist:
+                raise Http404('No Topic matches the given query.')
+        
+        total_pomodoros = await sync_to_async(record_pomodoro)(request.user, topic, duration)
         
         if total_pomodoros == 100:
-            Badge.objects.get_or_create(user=request.user, badge_type='pomodoro_100')
+            await Badge.objects.aget_or_create(user=request.user, badge_type='pomodoro_100')
             messages.success(request, '🎉 Badge Unlocked: 100 Pomodoros!')
         elif total_pomodoros == 500:
-            Badge.objects.get_or_create(user=request.user, badge_type='pomodoro_500')
+            await Badge.objects.aget_or_create(user=request.user, badge_type='pomodoro_500')
             messages.success(request, '🎉 Badge Unlocked: 500 Pomodoros!')
         
         return JsonResponse({
@@ -330,6 +528,183 @@ def pomodoro_log(request):
     return JsonResponse({'success': False})
 
 
+# Upper bound on sessions accepted by a single sync request
+POMODORO_SYNC_MAX_BATCH = 500
+
+POMODORO_BADGE_THRESHOLDS = [
+    (100, 'pomodoro_100'),
+    (500, 'pomodoro_500'),
+    (1000, 'pomodoro_1000'),
+]
+
+
+@login_required
+@require_POST
+def pomodoro_sync(request):
+    """
+    Ingest a batch of pomodoro sessions queued by an offline client.
+    
+    Expects a JSON body of the form::
+    
+        {"sessions": [{"client_id": "...", "started_at": "ISO-8601",
+                       "duration": 25, "topic_id": 12}, ...]}
+    
+    Sessions are de-duplicated on ``client_id`` and inserted with a single
+    bulk insert. XP and badges are updated once for the whole batch, and the
+    streak once per day the batch covers.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        entries = payload['sessions']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Expected a JSON body with a "sessions" list.'}, status=400)
+    
+    if not isinstance(entries, list):
+        return JsonResponse({'success': False, 'error': '"sessions" must be a list.'}, status=400)
+    if len(entries) > POMODORO_SYNC_MAX_BATCH:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {POMODORO_SYNC_MAX_BATCH} sessions can be synced per request.'
+        }, status=400)
+    
+    now = timezone.now()
+    rejected = {}
+    candidates = []
+    seen = set()
+    
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            rejected[str(index)] = 'invalid session'
+            continue
+        
+        client_id = str(entry.get('client_id') or '').strip()
+        if not client_id or len(client_id) > 64:
+            rejected[str(index)] = 'missing or invalid client_id'
+            continue
+        if client_id in seen:
+            continue
+        seen.add(client_id)
+        
+        started_at = parse_datetime(str(entry.get('started_at') or ''))
+        if started_at is None:
+            rejected[client_id] = 'invalid started_at'
+            continue
+        if timezone.is_naive(started_at):
+            started_at = timezone.make_aware(started_at)
+        if started_at > now:
+            rejected[client_id] = 'started_at is in the future'
+            continue
+        
+        try:
+            duration = int(entry.get('duration', 25))
+        except (TypeError, ValueError):
+            duration = 0
+        if not 1 <= duration <= 180:
+            rejected[client_id] = 'invalid duration'
+            continue
+        
+        topic_id = entry.get('topic_id') or None
+        if topic_id is not None:
+            topic_id = parse_id(topic_id)
+            if topic_id is None:
+                rejected[client_id] = 'unknown topic'
+                continue
+        
+        candidates.append({
+            'client_id': client_id,
+            'started_at': started_at,
+            'duration': duration,
+            'topic_id': topic_id,
+        })
+    
+    # Resolve topic ownership and already-synced keys with one query each
+    topic_ids = {c['topic_id'] for c in candidates if c['topic_id'] is not None}
+    owned_topic_ids = set()
+    if topic_ids:
+        owned_topic_ids = set(Topic.objects.filter(
+            pk__in=topic_ids,
+            subject__user=request.user
+        ).values_list('pk', flat=True))
+    
+    unlocked = []
+    
+    with write_transaction(router.db_for_write(PomodoroSession, instance=request.user)):
+        # Lock the profile first so a concurrent replay of the same queue waits
+        # here and then sees this batch's rows as duplicates
+        profile = UserProfile.objects.select_for_update().get(user=request.user)
+        
+        duplicates = set(PomodoroSession.objects.filter(
+            user=request.user,
+            client_id__in=[c['client_id'] for c in candidates]
+        ).values_list('client_id', flat=True))
+        
+        new_sessions = []
+        for c in candidates:
+            if c['client_id'] in duplicates:
+                continue
+            if c['topic_id'] is not None and c['topic_id'] not in owned_topic_ids:
+                rejected[c['client_id']] = 'unknown topic'
+                continue
+            new_sessions.append(PomodoroSession(
+                user=request.user,
+                topic_id=c['topic_id'],
+                duration_minutes=c['duration'],
+                started_at=c['started_at'],
+                completed=True,
+                client_id=c['client_id'],
+            ))
+        
+        previous_total = PomodoroSession.objects.filter(
+            user=request.user,
+            completed=True
+        ).count()
+        
+        PomodoroSession.objects.bulk_create(new_sessions, ignore_conflicts=True)
+        
+        total_pomodoros = PomodoroSession.objects.filter(
+            user=request.user,
+            completed=True
+        ).count()
+        
+        # Rows dropped by ignore_conflicts earn nothing
+        inserted = total_pomodoros - previous_total
+        if inserted < len(new_sessions):
+            landed = set(PomodoroSession.objects.filter(
+                user=request.user,
+                client_id__in=[s.client_id for s in new_sessions]
+            ).values_list('client_id', flat=True))
+            new_sessions = [s for s in new_sessions if s.client_id in landed]
+        xp_earned = 10 * inserted
+        
+        if inserted:
+            profile.total_xp += xp_earned
+            # Replay each study day in order, so a queue spanning several
+            # offline days extends the streak by each of them
+            for study_date in sorted({timezone.localdate(s.started_at) for s in new_sessions}):
+                profile.advance_streak(study_date)
+            profile.save()
+            
+            # Award every threshold crossed by this batch in one insert
+            unlocked = [
+                badge_type for threshold, badge_type in POMODORO_BADGE_THRESHOLDS
+                if previous_total < threshold <= total_pomodoros
+            ]
+            Badge.objects.bulk_create(
+                [Badge(user=request.user, badge_type=badge_type) for badge_type in unlocked],
+                ignore_conflicts=True
+            )
+    
+    return JsonResponse({
+        'success': True,
+        'accepted': [s.client_id for s in new_sessions],
+        'duplicates': sorted(duplicates),
+        'rejected': rejected,
+        'xp_earned': xp_earned,
+        'total_pomodoros': total_pomodoros,
+        'badges_unlocked': unlocked,
+    })
+
+
 @login_required
 def pomodoro_sessions(request):
     """View pomodoro session history."""
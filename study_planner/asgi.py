@@ -1,5 +1,9 @@
 """
 ASGI config for study_planner project.
+
+Serve it with uvicorn workers, e.g.::
+
+    gunicorn study_planner.asgi:application -k uvicorn.workers.UvicornWorker --workers 4
 """
 
 import os
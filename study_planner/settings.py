@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings include every other middleware
+    'planner.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -37,6 +39,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'planner.middleware.ShardRoutingMiddleware',
+    'planner.middleware.ReplicaRoutingMiddleware',
+    'planner.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,14 +66,52 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'study_planner.wsgi.application'
 
+# SQLite production profile (see planner/sqlite): WAL, synchronous=NORMAL, mmap and
+# a long busy timeout on every connection, write transactions that take the lock
+# at BEGIN, and hot write paths serialized per process.
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION', '') == '1'
+SQLITE_ENGINE = 'planner.sqlite' if SQLITE_PRODUCTION else 'django.db.backends.sqlite3'
+SQLITE_BUSY_TIMEOUT_MS = 20000
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
 # Database
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': SQLITE_ENGINE,
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Read replica for the read-only views (see planner/routers.py). Locally,
+# REPLICA_DB_PATH points at a read-only SQLite copy of the primary kept fresh by
+# `manage.py sync_replica`; in production, define DATABASES['replica'] as a
+# streaming replica of a Postgres primary instead.
+REPLICA_DATABASE = 'replica'
+REPLICA_DB_PATH = os.environ.get('REPLICA_DB_PATH', '')
+if REPLICA_DB_PATH:
+    DATABASES[REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{REPLICA_DB_PATH}?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    }
+# After a write, the client reads from the primary for this long; keep it above
+# the replica's lag (the sync interval for a SQLite copy)
+REPLICA_STICKY_SECONDS = 15
+
+# User-sharded mode (see planner/sharding.py): with SHARD_COUNT > 0, each user's
+# planner data lives in one of that many databases, picked by consistent hashing
+# on the user id. Locally each shard is a SQLite file next to db.sqlite3; point the
+# entries at separate servers in production. Set them up with `manage.py migrate_shards`.
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', '0'))
+SHARD_DATABASES = [f'shard{i}' for i in range(SHARD_COUNT)]
+for alias in SHARD_DATABASES:
+    DATABASES[alias] = {
+        'ENGINE': SQLITE_ENGINE,
+        'NAME': BASE_DIR / f'db-{alias}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['planner.sharding.ShardRouter', 'planner.routers.PrimaryReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -95,11 +138,74 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# static/css/app.css and static/vendor/ come from `npm run build` (see package.json).
+# collectstatic gives every file a content hash and precompresses it; WhiteNoise
+# then serves the hashed names with a far-future, immutable Cache-Control.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Syllabus processing limits
+SYLLABUS_MAX_UPLOAD_MB = 20
+SYLLABUS_MAX_PAGES = 300
+SYLLABUS_PDF_PAGES_PER_TASK = 16
+SYLLABUS_PDF_WORKERS = min(4, os.cpu_count() or 1)
+# Number of uploads extracted concurrently in the background
+SYLLABUS_BACKGROUND_WORKERS = 2
+# Uploads still 'processing' after this long are assumed lost and are queued again
+SYLLABUS_PROCESSING_TIMEOUT_MINUTES = 30
+
+# Trained difficulty / study-hours model (see `manage.py train_topic_model`)
+TOPIC_MODEL_PATH = BASE_DIR / 'ml' / 'topic_model.npy'
+
+# AI question generation
+QUESTION_BACKEND = os.environ.get('QUESTION_BACKEND', 'planner.question_backends.LocalBackend')
+QUESTION_CONCURRENCY = 4
+QUESTION_CHUNK_SIZE = 5
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+OPENAI_QUESTION_MODEL = 'gpt-3.5-turbo-1106'
+# Cached question pools: at most this many (topic, type, difficulty) entries,
+# each holding up to QUESTION_CACHE_POOL_SIZE questions
+QUESTION_CACHE_MAX_ENTRIES = 10000
+QUESTION_CACHE_POOL_SIZE = 50
+# Questions for the same topic at least this similar (estimated Jaccard over
+# character shingles) are treated as near-duplicates and not saved
+QUESTION_DEDUP_THRESHOLD = 0.8
+
+# Per-view latency/SQL metrics, served in Prometheus format at /metrics/
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', '') == '1'
+# Identical query shapes repeated this often in one request are flagged as N+1
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = 5
+# Only these client addresses may read /metrics/
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Number of reverse proxies in front of the app. Each appends to X-Forwarded-For,
+# so the client address is that many entries from the right. 0 uses REMOTE_ADDR.
+METRICS_TRUSTED_PROXY_HOPS = int(os.environ.get('METRICS_TRUSTED_PROXY_HOPS', '0'))
+# Scrapers sending "Authorization: Bearer <token>" may read /metrics/ from anywhere
+METRICS_BEARER_TOKEN = os.environ.get('METRICS_BEARER_TOKEN', '')
+
+# Request profiling: staff send "X-Profile: 1" (or ?_profile=1) to profile a request.
+# PROFILE_SAMPLE_RATE also profiles that fraction of all requests.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '') == '1'
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MAX_FILES = 200
+
+# Latency histograms for ai_utils functions (see `manage.py function_timings`).
+# Read at import time, so changing it needs a restart.
+FUNCTION_TIMING_ENABLED = os.environ.get('FUNCTION_TIMING_ENABLED', '') == '1'
+FUNCTION_TIMING_DIR = BASE_DIR / 'timings'
+FUNCTION_TIMING_FLUSH_SECONDS = 60
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -119,4 +225,6 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
 }
@@ -2,12 +2,15 @@
 URL configuration for study_planner project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from planner import api
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    re_path(r'^api/(?P<version>v1)/', include((api.router.urls, 'api'))),
     path('', include('planner.urls')),
 ]
 
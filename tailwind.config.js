@@ -0,0 +1,14 @@
+/** Tailwind build for the Django templates; run with `npm run build:css`. */
+module.exports = {
+  // Only classes that appear in these files end up in static/css/app.css
+  content: [
+    './templates/**/*.html',
+    './planner/**/*.py',
+  ],
+  // The sidebar toggle sets the "dark" class
+  darkMode: 'class',
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};